@@ -0,0 +1,181 @@
+"""
+On-disk rebuild cache of the matcher's prepared catalog structures.
+
+Saves the work of a catalog load (SQL read, term building, trigram indexing)
+so a restarted or newly spawned worker starts from files instead of the DB.
+It is a per-worker cache, not shared memory: the frame, terms and items are
+decoded into each worker's own pandas / Python objects on load, because the
+fuzzy scorers need Python strings. Only the trigram postings (if built) stay
+memory-mapped and are shared through the page cache.
+
+One directory per (catalog, fingerprint):
+    meta.json            format version, fingerprint, row count, frame columns, trigram grams
+    col_<n>_*.npy        one set of arrays per frame column (values / codes, null mask,
+                         or UTF-8 bytes + offsets for strings)
+    terms_*.npy          searchable terms (UTF-8 bytes + offsets)
+    items_*.npy          row id -> item mapping (UTF-8 bytes + offsets)
+    trigram_*.npy        trigram postings (int32 row ids + offsets), if built
+
+Everything is plain .npy read with allow_pickle=False plus JSON, so loading a
+cache directory never executes code, even if others can write to it.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from MatchIndexes import TrigramIndex
+
+CACHE_FORMAT = 2
+
+
+def _pack_strings(values: list[str]):
+    encoded = [str(v).encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return data, offsets
+
+
+def _unpack_strings(data: np.ndarray, offsets: np.ndarray) -> list[str]:
+    raw = data.tobytes()
+    return [raw[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+
+def _save_frame(path: Path, df: pd.DataFrame) -> list:
+    """
+    Writes each column as pickle-free arrays.
+    Returns: column specs for meta.json ([name, kind] per column)
+    """
+    specs = []
+    for n, col in enumerate(df.columns):
+        s = df[col]
+        prefix = path / f"col_{n}"
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            data, offsets = _pack_strings(s.cat.categories.astype(str).tolist())
+            np.save(f"{prefix}_codes.npy", s.cat.codes.to_numpy())
+            np.save(f"{prefix}_data.npy", data)
+            np.save(f"{prefix}_offsets.npy", offsets)
+            kind = "category"
+        elif s.dtype.kind in "biufmM":
+            np.save(f"{prefix}_values.npy", s.to_numpy())
+            kind = "numeric"
+        else:
+            # object / extension columns: strings with a null mask
+            nulls = s.isna().to_numpy()
+            data, offsets = _pack_strings(["" if null else v for v, null in zip(s.tolist(), nulls)])
+            np.save(f"{prefix}_nulls.npy", nulls)
+            np.save(f"{prefix}_data.npy", data)
+            np.save(f"{prefix}_offsets.npy", offsets)
+            kind = "string"
+        specs.append([str(col), kind])
+    return specs
+
+
+def _load_frame(path: Path, specs: list) -> pd.DataFrame:
+    def arr(name):
+        return np.load(path / f"{name}.npy", allow_pickle=False)
+
+    columns = {}
+    for n, (name, kind) in enumerate(specs):
+        prefix = f"col_{n}"
+        if kind == "category":
+            categories = _unpack_strings(arr(f"{prefix}_data"), arr(f"{prefix}_offsets"))
+            columns[name] = pd.Categorical.from_codes(arr(f"{prefix}_codes"), categories=categories)
+        elif kind == "numeric":
+            columns[name] = arr(f"{prefix}_values")
+        else:
+            values = np.array(_unpack_strings(arr(f"{prefix}_data"), arr(f"{prefix}_offsets")), dtype=object)
+            values[arr(f"{prefix}_nulls")] = None
+            columns[name] = values
+    return pd.DataFrame(columns)
+
+
+class CatalogRebuildCache:
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, catalog: str, fingerprint) -> Path:
+        digest = hashlib.sha1(repr(fingerprint).encode("utf-8")).hexdigest()[:16]
+        return self.root / f"{catalog}-v{CACHE_FORMAT}-{digest}"
+
+    def load(self, catalog: str, fingerprint):
+        """
+        Returns: dict(df, terms, items, trigram) or None if nothing is cached for this fingerprint.
+        trigram is None when it was not built at save time.
+        """
+        path = self.path_for(catalog, fingerprint)
+        meta_path = path / "meta.json"
+        if not meta_path.exists():
+            return None
+
+        meta = json.loads(meta_path.read_text())
+        if meta["format"] != CACHE_FORMAT or meta["fingerprint"] != repr(fingerprint):
+            return None
+
+        def arr(name, mmap_mode=None):
+            return np.load(path / f"{name}.npy", mmap_mode=mmap_mode, allow_pickle=False)
+
+        trigram = None
+        if meta["trigram_grams"] is not None:
+            # postings stay mapped: the one structure workers really share
+            trigram = TrigramIndex.from_arrays(
+                meta["rows"], meta["trigram_grams"], arr("trigram_data", "r"), arr("trigram_offsets", "r")
+            )
+
+        return {
+            "df": _load_frame(path, meta["columns"]),
+            "terms": _unpack_strings(arr("terms_data"), arr("terms_offsets")),
+            "items": _unpack_strings(arr("items_data"), arr("items_offsets")),
+            "trigram": trigram,
+        }
+
+    def save(self, catalog: str, fingerprint, df: pd.DataFrame, terms: list[str], items: list, trigram: TrigramIndex = None):
+        """
+        Writes to a temp dir and renames it into place, so concurrent workers never
+        see a half-written cache entry (the first finished writer wins).
+        Older entries of the same catalog are removed.
+        """
+        path = self.path_for(catalog, fingerprint)
+        if path.exists():
+            return path
+
+        tmp = Path(tempfile.mkdtemp(prefix=f".{catalog}-", dir=self.root))
+        try:
+            columns = _save_frame(tmp, df)
+            for name, values in (("terms", terms), ("items", items)):
+                data, offsets = _pack_strings(values)
+                np.save(tmp / f"{name}_data.npy", data)
+                np.save(tmp / f"{name}_offsets.npy", offsets)
+
+            grams = None
+            if trigram is not None:
+                grams, data, offsets = trigram.to_arrays()
+                np.save(tmp / "trigram_data.npy", data)
+                np.save(tmp / "trigram_offsets.npy", offsets)
+
+            (tmp / "meta.json").write_text(json.dumps({
+                "format": CACHE_FORMAT,
+                "fingerprint": repr(fingerprint),
+                "rows": len(terms),
+                "columns": columns,
+                "trigram_grams": grams,
+            }))
+            os.rename(tmp, path)
+        except OSError:
+            # another worker renamed its copy first
+            shutil.rmtree(tmp, ignore_errors=True)
+            if not path.exists():
+                raise
+
+        for old in self.root.glob(f"{catalog}-v*"):
+            if old != path:
+                shutil.rmtree(old, ignore_errors=True)
+        return path
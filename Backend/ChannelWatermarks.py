@@ -0,0 +1,129 @@
+import threading
+import logging
+from decimal import Decimal
+
+from sqlalchemy import text
+
+logger = logging.getLogger("watermarks")
+
+
+class ChannelWatermarks:
+    """
+    Per-channel high-water marks (Slack `ts` of the newest digested message),
+    persisted in Postgres so polls only pick up messages newer than the last run.
+
+    Marks only move forward: advance() ignores a ts older than the stored one,
+    so an overlapping or retried poll can never rewind a channel. A poll claims
+    its range with claim() (compare-and-set on the mark it read) before the LLM
+    step, so overlapping polls of the same channel never digest the same delta twice.
+    """
+
+    def __init__(self, engine, table="slack_channel_watermark"):
+        self.engine = engine
+        self.table = table
+        self._ready = False
+        self._lock = threading.Lock()
+
+    def _ensure_table(self):
+        with self._lock:
+            if self._ready:
+                return
+            with self.engine.begin() as conn:
+                conn.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                    f"channel_id TEXT PRIMARY KEY, "
+                    f"last_ts TEXT NOT NULL, "
+                    f"updated_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+                ))
+            self._ready = True
+
+    def get(self, channel_id):
+        """Returns the stored ts string for `channel_id`, or None on the first run."""
+        self._ensure_table()
+        with self.engine.connect() as conn:
+            return conn.execute(
+                text(f"SELECT last_ts FROM {self.table} WHERE channel_id = :channel_id"),
+                {"channel_id": channel_id},
+            ).scalar()
+
+    def advance(self, channel_id, ts):
+        """Move the channel's mark to `ts` if it is newer than the stored one."""
+        self._ensure_table()
+        with self.engine.begin() as conn:
+            conn.execute(
+                text(
+                    f"INSERT INTO {self.table} (channel_id, last_ts, updated_at) "
+                    f"VALUES (:channel_id, :ts, now()) "
+                    f"ON CONFLICT (channel_id) DO UPDATE "
+                    f"SET last_ts = EXCLUDED.last_ts, updated_at = now() "
+                    f"WHERE {self.table}.last_ts::numeric < EXCLUDED.last_ts::numeric"
+                ),
+                {"channel_id": channel_id, "ts": ts},
+            )
+        logger.info("watermark channel=%s advanced to ts=%s", channel_id, ts)
+
+    def claim(self, channel_id, from_ts, to_ts) -> bool:
+        """
+        Atomically move the channel's mark from `from_ts` (the mark this poll read;
+        None on a first run) to `to_ts` before the range is digested.
+        Returns False if another poll already moved the mark, i.e. claimed this range.
+        """
+        self._ensure_table()
+        with self.engine.begin() as conn:
+            if from_ts is None:
+                result = conn.execute(
+                    text(
+                        f"INSERT INTO {self.table} (channel_id, last_ts, updated_at) "
+                        f"VALUES (:channel_id, :ts, now()) "
+                        f"ON CONFLICT (channel_id) DO UPDATE "
+                        f"SET last_ts = EXCLUDED.last_ts, updated_at = now() "
+                        f"WHERE {self.table}.last_ts::numeric < EXCLUDED.last_ts::numeric"
+                    ),
+                    {"channel_id": channel_id, "ts": to_ts},
+                )
+            else:
+                result = conn.execute(
+                    text(
+                        f"UPDATE {self.table} SET last_ts = :ts, updated_at = now() "
+                        f"WHERE channel_id = :channel_id AND last_ts = :from_ts"
+                    ),
+                    {"channel_id": channel_id, "ts": to_ts, "from_ts": from_ts},
+                )
+        claimed = result.rowcount == 1
+        logger.info("watermark channel=%s claim %s -> %s: %s", channel_id, from_ts, to_ts, "ok" if claimed else "taken")
+        return claimed
+
+    def release(self, channel_id, claimed_ts, previous_ts):
+        """
+        Undo claim() after a failed digest so the next poll retries the range.
+        No-op if a later poll has already moved the mark past `claimed_ts`.
+        """
+        self._ensure_table()
+        params = {"channel_id": channel_id, "claimed_ts": claimed_ts, "previous_ts": previous_ts}
+        with self.engine.begin() as conn:
+            if previous_ts is None:
+                conn.execute(
+                    text(f"DELETE FROM {self.table} WHERE channel_id = :channel_id AND last_ts = :claimed_ts"),
+                    params,
+                )
+            else:
+                conn.execute(
+                    text(
+                        f"UPDATE {self.table} SET last_ts = :previous_ts, updated_at = now() "
+                        f"WHERE channel_id = :channel_id AND last_ts = :claimed_ts"
+                    ),
+                    params,
+                )
+        logger.info("watermark channel=%s released %s back to %s", channel_id, claimed_ts, previous_ts)
+
+    def reset(self, channel_id):
+        """Forget the channel's mark; the next poll falls back to its lookback window."""
+        self._ensure_table()
+        with self.engine.begin() as conn:
+            conn.execute(text(f"DELETE FROM {self.table} WHERE channel_id = :channel_id"), {"channel_id": channel_id})
+
+
+def newest_ts(messages):
+    """Largest Slack ts among parsed messages (compared numerically), or None."""
+    stamps = [m["timestamp"] for m in messages if m.get("timestamp")]
+    return max(stamps, key=Decimal) if stamps else None
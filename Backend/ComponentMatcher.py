@@ -1,45 +1,571 @@
+import os
+import re
+import copy
+import uuid
+import shutil
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
 import pandas as pd
-import spacy
 from rapidfuzz import process, fuzz
 from sqlalchemy import text
 
+from MatchIndexes import TrigramIndex, ExactIndex, AhoCorasick, HierarchyIndex, TfidfIndex, table_fingerprint
+from CatalogRebuildCache import CatalogRebuildCache, _pack_strings, _unpack_strings
+
+# Keyword extraction only reads POS tags + lexical attributes, so everything
+# else in en_core_web_sm (parser, ner, lemmatizer, ...) can be skipped.
+POS_PIPES = ("tok2vec", "tagger", "attribute_ruler")
+KEYWORD_POS = {"NOUN", "PROPN", "ADJ"}
+
+# compact_catalog=True: only these machine_details columns stay in memory (searching,
+# hierarchy, result keys); the wide ones (notes, finish, ...) are fetched for final hits only
+CATALOG_COLUMNS = ("product", "version", "item", "name", "internal_part_name", "quantity", "material", "category")
+CATEGORY_COLUMNS = ("product", "version", "material", "category")
+DETAIL_KEY = ("product", "version", "item")
+
+# extractor="regex": same token shape as the spaCy filter (alphabetic, or hyphenated like "PN-0012")
+KEYWORD_RE = re.compile(r"[A-Za-z0-9]+(?:-[A-Za-z0-9]+)+|[A-Za-z]+")
+STOP_WORDS = frozenset("""
+a about above after again against all also am an and any are around as at be because been before
+being below between both but by can could did do does doing done down during each either else
+even ever every few for from further get gets getting go goes going gone got had has have having
+he her here hers herself him himself his how i if in into is it its itself just know let like
+make may me might more most much must my myself need no nor not now of off on once one only or
+other our ours ourselves out over own please really same see seems she should so some still such
+sure than thank thanks that the their theirs them themselves then there these they thing things
+think this those though through to too try under until up upon us very was we well were what
+when where which while who whom why will with within without would yeah yes yet you your yours
+yourself yourselves hey hi hello ok okay lol today tomorrow yesterday guys team
+""".split())
+
+
+class MatchCache:
+    """
+    Bounded LRU (+ optional TTL) cache of keyword -> ranked fuzzy matches.
+    Keys carry the catalog name and version, so a reloaded catalog never
+    serves stale hits; invalidate() also drops the old entries eagerly.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, stored_at = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, catalog: str = None):
+        """Drop every entry (or only those of one catalog, e.g. "component")."""
+        with self._lock:
+            if catalog is None:
+                self._data.clear()
+            else:
+                for key in [k for k in self._data if k[0] == catalog]:
+                    del self._data[key]
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+# Per-worker catalogs of the sharded matching pool, keyed by
+# (matcher, catalog, version); loaded from the parent's term files on first use.
+_POOL_CHOICES = OrderedDict()
+_POOL_CHOICES_MAX = 4
+
+
+def _pool_choices(key, path):
+    choices = _POOL_CHOICES.get(key)
+    if choices is None:
+        choices = _unpack_strings(np.load(f"{path}_data.npy"), np.load(f"{path}_offsets.npy"))
+        _POOL_CHOICES[key] = choices
+        while len(_POOL_CHOICES) > _POOL_CHOICES_MAX:
+            _POOL_CHOICES.popitem(last=False)
+    else:
+        _POOL_CHOICES.move_to_end(key)
+    return choices
+
+
+def _pool_match(key, path, queries, top_k, score_cutoff):
+    """Runs in a pool worker: WRatio top-k for one shard of keywords."""
+    choices = _pool_choices(key, path)
+    return {
+        q: [
+            (t, float(s), int(i))
+            for (t, s, i) in process.extract(q, choices, scorer=fuzz.WRatio, limit=top_k, score_cutoff=score_cutoff)
+        ]
+        for q in queries
+    }
+
+
 class ComponentMatcher:
-    def __init__(self, source=None, engine=None):
+    def __init__(
+        self,
+        source=None,
+        engine=None,
+        batch_size: int = 256,
+        n_process: int = 1,
+        match_mode: str = "loop",
+        top_k: int = 5,
+        fuzzy_cutoff: float = 50,
+        workers: int = -1,
+        cache_size: int = 10000,
+        cache_ttl: float = None,
+        prefilter: int = 0,
+        exact_match: bool = True,
+        extractor: str = "spacy",
+        tfidf_cutoff: float = 0.3,
+        rebuild_cache_dir: str = None,
+        compact_catalog: bool = True,
+        parallel_workers: int = 0,
+        parallel_min_keywords: int = 200,
+        max_partitions: int = 16,
+    ):
         """
         source:
           - if engine is None: path to CSV (old behavior)
           - if engine is provided: table name (default 'machine_details')
         engine:
           - SQLAlchemy engine (from your get_engine())
+        batch_size / n_process:
+          - passed to nlp.pipe when extracting keywords from many messages
+        match_mode:
+          - "loop": process.extract per keyword
+          - "matrix": one process.cdist over all unique keywords x all terms
+          - "aho": no spaCy / fuzzy scoring; one Aho-Corasick pass over the transcript
+            for every component name, part name and supplier name
+          - "tfidf": char n-gram TF-IDF cosine, keywords scored in chunked sparse matrix products
+            (match_score = cosine x 100; needs scikit-learn)
+        top_k / fuzzy_cutoff:
+          - max hits kept per keyword, and the minimum WRatio score (0-100) for a hit
+        workers:
+          - rapidfuzz cdist worker threads (-1 = all cores)
+        cache_size / cache_ttl:
+          - keyword match cache bounds (entries, seconds; 0 size disables, None ttl = no expiry)
+        prefilter:
+          - 0 = score every catalog row; N > 0 = shortlist the N rows sharing the most
+            character trigrams with the keyword and only score those (recall/speed knob)
+        exact_match:
+          - resolve dotted item IDs and exact name / internal_part_name mentions by hash
+            lookup before spaCy + fuzzy matching (which then only sees the leftover text)
+        extractor:
+          - "spacy": NOUN/PROPN/ADJ tokens from en_core_web_sm POS tags
+          - "regex": pure-Python tokenizer + stopword list; spaCy is never imported
+            (fast cold start, lower memory, lower precision)
+        tfidf_cutoff:
+          - minimum cosine similarity (0-1) for a hit in "tfidf" mode
+        rebuild_cache_dir:
+          - if set, the prepared catalog (frame, terms, items, trigram postings) is saved
+            there per catalog fingerprint and loaded on the next start instead of being
+            rebuilt from the DB. Each worker still holds its own copy; only the trigram
+            postings stay memory-mapped (see CatalogRebuildCache)
+        compact_catalog:
+          - keep only CATALOG_COLUMNS in self.df (repeated strings as categoricals) and
+            fetch the remaining columns for the rows build_child_parent_df returns.
+            Trade-off: a digest whose items are not yet in the detail cache (cache_size
+            items, cleared on reload) costs one `item = ANY(...)` query for those items;
+            CSV sources are read once per catalog load
+        parallel_workers / parallel_min_keywords:
+          - N > 0 = shard loop/matrix fuzzy scoring across a persistent pool of N processes
+            once a digest has at least parallel_min_keywords uncached keywords
+            (smaller batches stay in-process); partitions and reloaded copies share the
+            pool, and close() on any of them stops it
+        max_partitions:
+          - most (product, version) partitions kept built; the least recently used is dropped
         """
         self.engine = engine
         self.machine_table = source or "machine_details"
-        self.fuzzy_cutoff = 50
-        
-        if self.engine is None:
-            self.df = pd.read_csv(source)
+        self.source = source
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.top_k = top_k
+        self.match_mode = match_mode
+        self.workers = workers
+        self.batch_size = batch_size
+        self.n_process = n_process
+
+        if extractor not in ("spacy", "regex"):
+            raise ValueError(f"Unknown extractor: {extractor}")
+        self.extractor = extractor
+        self.nlp = self._load_spacy() if extractor == "spacy" else None
+
+        # bumped on every (re)load; part of the match cache key
+        self.catalog_versions = {"component": 0, "supplier": 0}
+        self.match_cache = MatchCache(maxsize=cache_size, ttl=cache_ttl)
+        self.prefilter = prefilter
+        self.exact_match = exact_match
+        self.tfidf_cutoff = tfidf_cutoff
+        self._catalog_indexes = {}  # (kind, catalog) -> (version, index)
+        self._automaton = None  # (catalog versions, AhoCorasick)
+        self.rebuild_cache = CatalogRebuildCache(rebuild_cache_dir) if rebuild_cache_dir else None
+        self.compact_catalog = compact_catalog
+        # item -> wide machine_details rows for compact_catalog; shared with partitions
+        self.detail_cache = MatchCache(maxsize=cache_size, ttl=cache_ttl)
+        self._detail_columns = None
+        self._csv_details = None  # (component version, full CSV frame)
+        self.parallel_workers = parallel_workers
+        self.parallel_min_keywords = parallel_min_keywords
+        # one process pool per matcher family: shared (same dict) by partitions and
+        # reloaded copies; workers get each catalog through a term file, see _pool_terms_file
+        self._pool = {"executor": None, "dir": None, "files": OrderedDict()}
+        self._uid = uuid.uuid4().hex[:12]
+        self._parent = None  # set on partition views, see partition()
+        self.max_partitions = max_partitions
+        self._partitions = OrderedDict()  # (product, version) -> ComponentMatcher, LRU order
+
+        self.df = None
+        self.component_terms = None
+        self.exact_index = None
+        self.hierarchy_index = None
+        self.catalog_fingerprint = None
+        self._load_catalog()
+
+        self.supplier_table = "supplier_master"
+        self.supplier_df = None
+        self.supplier_terms = None
+        self.supplier_fingerprint = None
+
+    def _load_catalog(self, fingerprint=None):
+        """
+        (Re)load machine_details and rebuild the searchable component terms.
+        Called once from __init__ and again by refresh() when the BOM changed.
+        fingerprint: the one the caller just computed, so it is not fetched twice.
+        """
+        if fingerprint is None:
+            fingerprint = self.get_catalog_fingerprint()
+
+        # the saved frame differs between compact and full mode
+        cache_key = (fingerprint, self.compact_catalog)
+        cached = self.rebuild_cache.load("component", cache_key) if self.rebuild_cache else None
+        if cached is not None:
+            self.df = cached["df"]
+            self.component_terms = cached["terms"]
+            items = cached["items"]
         else:
-            self.df = pd.read_sql_query(
-                f"SELECT * FROM {self.machine_table}",
-                self.engine
+            if self.compact_catalog:
+                self.df = self._read_compact_catalog()
+            elif self.engine is None:
+                self.df = pd.read_csv(self.source)
+            else:
+                self.df = pd.read_sql_query(
+                    f"SELECT * FROM {self.machine_table}",
+                    self.engine
+                )
+
+            # Build searchable list from machine_details (use both name + internal_part_name)
+            self.component_terms = (
+                self.df[["name", "internal_part_name"]]
+                .fillna("")
+                .astype(str)
+                .agg(" ".join, axis=1)
+                .str.strip()
+                .tolist()
             )
+            items = self.df["item"].fillna("").astype(str).tolist()
 
-        self.nlp = spacy.load("en_core_web_sm")
-        
-        # Build searchable list from machine_details (use both name + internal_part_name)
-        self.component_terms = (
-            self.df[["name", "internal_part_name"]]
-            .fillna("")
-            .astype(str)
-            .agg(" ".join, axis=1)
-            .str.strip()
-            .tolist()
+        self._build_row_indexes(items)
+        self.catalog_fingerprint = fingerprint
+        self._bump_catalog_version("component")
+
+        if self.rebuild_cache is None:
+            return
+        if cached is not None:
+            if cached["trigram"] is not None:
+                self._catalog_indexes[("trigram", "component")] = (self.catalog_versions["component"], cached["trigram"])
+        else:
+            trigram = self._get_catalog_index("trigram", "component", self.component_terms) if self.prefilter else None
+            self.rebuild_cache.save(
+                "component",
+                cache_key,
+                df=self.df,
+                terms=self.component_terms,
+                items=items,
+                trigram=trigram,
+            )
+
+    def _read_compact_catalog(self) -> pd.DataFrame:
+        """machine_details restricted to CATALOG_COLUMNS, with categorical dtypes for repeated strings."""
+        if self.engine is None:
+            df = pd.read_csv(self.source, usecols=lambda c: c in CATALOG_COLUMNS)
+        else:
+            columns = pd.read_sql_query(f"SELECT * FROM {self.machine_table} LIMIT 0", self.engine).columns
+            keep = [c for c in columns if c in CATALOG_COLUMNS]
+            df = pd.read_sql_query(f"SELECT {', '.join(keep)} FROM {self.machine_table}", self.engine)
+
+        for col in CATEGORY_COLUMNS:
+            if col in df.columns:
+                df[col] = df[col].astype("category")
+        return df
+
+    def _attach_details(self, rows: pd.DataFrame) -> pd.DataFrame:
+        """
+        Adds the columns compact_catalog left out, fetched only for the items in `rows`.
+        Matched on (product, version, item); columns come back in table order,
+        followed by the non-table columns of `rows` (role, child_item_id, ...).
+        """
+        if not self.compact_catalog or rows.empty:
+            return rows
+
+        ids = rows["item"].dropna().astype(str).unique().tolist()
+        details = self._detail_rows(ids)
+
+        key = [c for c in DETAIL_KEY if c in details.columns and c in rows.columns]
+        details = details.drop_duplicates(subset=key)
+        left = rows.drop(columns=[c for c in details.columns if c not in key and c in rows.columns])
+        for col in key:
+            left[col] = left[col].astype(object)
+            details[col] = details[col].astype(object)
+        if "item" in key:
+            left["item"] = left["item"].where(left["item"].isna(), left["item"].astype(str))
+            details["item"] = details["item"].astype(str)
+
+        out = left.merge(details, on=key, how="left")
+        extra = [c for c in rows.columns if c not in details.columns]
+        return out[list(details.columns) + extra]
+
+    def _detail_rows(self, ids: list[str]) -> pd.DataFrame:
+        """
+        Full machine_details rows of `ids`. DB: served from detail_cache, with one
+        query for the items not cached yet; CSV: filtered from a copy read once per load.
+        """
+        if self.engine is None:
+            version = self.catalog_versions["component"]
+            if self._csv_details is None or self._csv_details[0] != version:
+                self._csv_details = (version, pd.read_csv(self.source))
+            details = self._csv_details[1]
+            return details[details["item"].astype(str).isin(ids)]
+
+        version = self.catalog_versions["component"]
+        records, missing = [], []
+        for item in ids:
+            cached = self.detail_cache.get(("details", version, item))
+            if cached is None:
+                missing.append(item)
+            else:
+                records.extend(cached)
+
+        if missing or self._detail_columns is None:
+            q = text(f"SELECT * FROM {self.machine_table} WHERE item = ANY(:ids)")
+            fetched = pd.read_sql(q, self.engine, params={"ids": missing})
+            self._detail_columns = list(fetched.columns)
+            by_item = {item: [] for item in missing}
+            for row in fetched.to_dict("records"):
+                by_item.setdefault(str(row["item"]), []).append(row)
+            for item, item_rows in by_item.items():
+                self.detail_cache.put(("details", version, item), item_rows)
+                records.extend(item_rows)
+
+        return pd.DataFrame.from_records(records, columns=self._detail_columns)
+
+    def _build_row_indexes(self, items: list[str]):
+        """Exact-match and hierarchy indexes over the rows of self.df."""
+        self.exact_index = ExactIndex(
+            items=items,
+            names=self.df[["name", "internal_part_name"]].fillna("").astype(str).values.tolist(),
         )
+        self.hierarchy_index = HierarchyIndex(items)
+
+    def _bump_catalog_version(self, catalog: str):
+        self.catalog_versions[catalog] += 1
+        self.match_cache.invalidate(catalog)
+        if catalog == "component" and self._parent is None:
+            self.detail_cache.invalidate()
+            self._csv_details = None
+        for key in [k for k in self._catalog_indexes if k[1] == catalog]:
+            del self._catalog_indexes[key]
+        # partitions are slices of the old catalog (they own no processes: the pool is shared)
+        self._partitions.clear()
+
+    def partition(self, product: str = None, version: str = None) -> "ComponentMatcher":
+        """
+        Matcher restricted to one product and/or version of machine_details.
+        Shares spaCy, settings and suppliers with this matcher but has its own
+        terms, indexes and match cache, so scoring cost and result size scale
+        with the partition. Partitions are built on first use, at most
+        max_partitions are kept (least recently used dropped) and all are dropped on reload.
+        No filter given -> returns self.
+        Raises ValueError if no catalog row has that product / version, so unknown
+        values never occupy a partition slot.
+        """
+        if product is None and version is None:
+            return self
+
+        key = (product, version)
+        part = self._partitions.get(key)
+        if part is not None:
+            self._partitions.move_to_end(key)
+            return part
+
+        mask = np.ones(len(self.df), dtype=bool)
+        if product is not None:
+            mask &= (self.df["product"].astype(str) == str(product)).to_numpy()
+        if version is not None:
+            mask &= (self.df["version"].astype(str) == str(version)).to_numpy()
+        positions = np.flatnonzero(mask)
+        if not len(positions):
+            raise ValueError(f"No catalog rows for product={product!r} version={version!r}")
+
+        part = copy.copy(self)
+        part._parent = self
+        part._partitions = OrderedDict()
+        part.df = self.df.take(positions).reset_index(drop=True)
+        part.component_terms = [self.component_terms[i] for i in positions]
+        part._build_row_indexes(part.df["item"].fillna("").astype(str).tolist())
+        part.catalog_versions = dict(self.catalog_versions)
+        part.match_cache = MatchCache(maxsize=self.match_cache.maxsize, ttl=self.match_cache.ttl)
+        part._catalog_indexes = {}
+        part._automaton = None
+        part.rebuild_cache = None
+        part._uid = uuid.uuid4().hex[:12]
+        self._partitions[key] = part
+        while len(self._partitions) > self.max_partitions:
+            self._partitions.popitem(last=False)
+        return part
+
+    def _get_catalog_index(self, kind: str, catalog: str, choices: list[str]):
+        """
+        Build a search index ("trigram" or "tfidf") for a catalog on first use
+        (rebuilt after each reload).
+        """
+        version = self.catalog_versions[catalog]
+        cached = self._catalog_indexes.get((kind, catalog))
+        if cached is None or cached[0] != version:
+            index = TrigramIndex(choices) if kind == "trigram" else TfidfIndex(choices)
+            cached = (version, index)
+            self._catalog_indexes[(kind, catalog)] = cached
+        return cached[1]
+
+    def get_catalog_fingerprint(self):
+        """
+        Cheap change detector for the BOM.
+        DB: file node + insert/update/delete counters from pg_stat_user_tables, no table scan (see table_fingerprint).
+        CSV: file size + mtime.
+        Returns: tuple
+        """
+        if self.engine is None:
+            st = os.stat(self.source)
+            return (st.st_size, st.st_mtime_ns)
+        return self._table_fingerprint(self.machine_table)
+
+    def _table_fingerprint(self, table: str):
+        return table_fingerprint(self.engine, table)
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Rebuild machine_details (and supplier_master, if it was loaded) only if
+        they changed since the last load. Reloads in place, so it must not run
+        while another thread uses this matcher; see refreshed() for that case.
+        Returns True if a rebuild happened.
+        """
+        rebuilt = False
+        fingerprint = self.get_catalog_fingerprint()
+        if force or fingerprint != self.catalog_fingerprint:
+            self._load_catalog(fingerprint)
+            rebuilt = True
+        if self.supplier_df is not None:
+            supplier_fingerprint = self._table_fingerprint(self.supplier_table)
+            if force or supplier_fingerprint != self.supplier_fingerprint:
+                self._load_suppliers(self.supplier_table, force=True, fingerprint=supplier_fingerprint)
+                rebuilt = True
+        return rebuilt
+
+    def refreshed(self, force: bool = False) -> "ComponentMatcher":
+        """
+        Copy-on-write refresh(): returns a new matcher holding the reloaded catalogs
+        (sharing spaCy, settings, rebuild cache and caches with this one), or self if
+        nothing changed. This matcher is left untouched, so find_components calls
+        already running on it finish against a consistent catalog snapshot.
+        """
+        fingerprint = self.get_catalog_fingerprint()
+        catalog_changed = force or fingerprint != self.catalog_fingerprint
+        supplier_fingerprint = self._table_fingerprint(self.supplier_table) if self.supplier_df is not None else None
+        supplier_changed = self.supplier_df is not None and (force or supplier_fingerprint != self.supplier_fingerprint)
+        if not (catalog_changed or supplier_changed):
+            return self
+
+        new = copy.copy(self)
+        # everything a reload mutates in place gets its own container
+        new.catalog_versions = dict(self.catalog_versions)
+        new._catalog_indexes = dict(self._catalog_indexes)
+        new._partitions = OrderedDict()
+        new._automaton = None
+        if catalog_changed:
+            new._load_catalog(fingerprint)
+        if supplier_changed:
+            new._load_suppliers(new.supplier_table, force=True, fingerprint=supplier_fingerprint)
+        return new
+
+    @staticmethod
+    def _load_spacy():
+        # imported here so extractor="regex" deployments never pay for spaCy
+        import spacy
+        return spacy.load("en_core_web_sm")
+
+    def _extract_keywords(self, texts):
+        """Keywords of all texts, in message order, using the configured extractor."""
+        if self.extractor == "regex":
+            return self._extract_keywords_regex(texts)
+        return self._extract_keywords_batch(texts)
+
+    @staticmethod
+    def _extract_keywords_regex(texts):
+        """
+        No-spaCy keyword extractor: word / hyphenated tokens that are not stopwords.
+        Keeps verbs and adverbs spaCy would drop; fuzzy_cutoff filters most of that noise.
+        Returns: list[str]
+        """
+        return [
+            tok
+            for t in texts
+            for tok in KEYWORD_RE.findall(t)
+            if len(tok) > 1 and tok.lower() not in STOP_WORDS
+        ]
 
-        
-        self.supplier_df = None
-        self.supplier_terms = None
-    
     def _extract_nouns(self, text):
         """
         Minimal keyword extractor using spaCy POS tags.
@@ -47,34 +573,123 @@ class ComponentMatcher:
         Returns: list[str]
         """
         doc = self.nlp(text)
+        return self._keywords_from_doc(doc)
+
+    @staticmethod
+    def _keywords_from_doc(doc):
         return [
             tok.text
             for tok in doc
-            if tok.pos_ in {"NOUN", "PROPN", "ADJ"}
+            if tok.pos_ in KEYWORD_POS
             and not tok.is_stop
             and (tok.is_alpha or "-" in tok.text)
         ]
+
+    def _extract_keywords_batch(self, texts):
+        """
+        Batched version of _extract_nouns for many messages.
+        Streams texts through nlp.pipe with the unused components disabled.
+        Returns: list[str] (keywords of all texts, in message order)
+        """
+        disabled = [name for name in self.nlp.pipe_names if name not in POS_PIPES]
+        keywords = []
+        for doc in self.nlp.pipe(
+            texts,
+            batch_size=self.batch_size,
+            n_process=self.n_process,
+            disable=disabled,
+        ):
+            keywords.extend(self._keywords_from_doc(doc))
+        return keywords
     
-    def _best_fuzzy_match(self, query: str, choices: list[str]):
+    def _best_fuzzy_match(self, query: str, choices: list[str], candidate_ids=None):
         """
-        Returns: (best_match_text, score_0_100, index_in_choices)
+        candidate_ids: optional sorted row ids to restrict scoring to (trigram shortlist).
+        Returns: list of (best_match_text, score_0_100, index_in_choices), best first.
+        Only hits scoring >= fuzzy_cutoff are kept, at most top_k of them.
         """
         if not choices:
-            return ("", 0.0, -1)
+            return []
 
-        match = process.extract(query, choices, scorer=fuzz.WRatio)
-        if match is None:
-            return ("", 0.0, -1)
-        
+        if candidate_ids is not None:
+            shortlist = [choices[i] for i in candidate_ids]
+            match = process.extract(
+                query,
+                shortlist,
+                scorer=fuzz.WRatio,
+                limit=self.top_k,
+                score_cutoff=self.fuzzy_cutoff,
+            )
+            return [(t, float(s), int(candidate_ids[i])) for (t, s, i) in match]
+
+        match = process.extract(
+            query,
+            choices,
+            scorer=fuzz.WRatio,
+            limit=self.top_k,
+            score_cutoff=self.fuzzy_cutoff,
+        )
         return [(t, float(s), int(i)) for (t, s, i) in match]
 
+    def _matrix_fuzzy_match(self, queries: list[str], choices: list[str], chunk_size: int = 128):
+        """
+        Scores every query against every choice with one process.cdist call per
+        chunk of queries (multi-threaded, scores below fuzzy_cutoff come back as 0).
+        Chunking bounds the score matrix to chunk_size x len(choices) float64s.
+        Returns: {query: [(best_match_text, score_0_100, index_in_choices), ...]}
+        Same ordering as _best_fuzzy_match: score desc, then lowest index first.
+        """
+        out = {q: [] for q in queries}
+        if not queries or not choices:
+            return out
+
+        n = len(choices)
+        k = min(self.top_k, n)
+        for start in range(0, len(queries), chunk_size):
+            block = queries[start:start + chunk_size]
+            scores = process.cdist(
+                block,
+                choices,
+                scorer=fuzz.WRatio,
+                score_cutoff=self.fuzzy_cutoff,
+                workers=self.workers,
+                dtype=np.float64,
+            )
+            for q, row in zip(block, scores):
+                if k < n:
+                    # every index scoring >= the k-th best, so ties are resolved by index below
+                    kth = np.partition(row, n - k)[n - k]
+                    cand = np.flatnonzero(row >= kth)
+                else:
+                    cand = np.arange(n)
+                cand = cand[np.lexsort((cand, -row[cand]))][:k]
+                cand = cand[(row[cand] > 0) & (row[cand] >= self.fuzzy_cutoff)]
+                out[q] = [(choices[i], float(row[i]), int(i)) for i in cand]
+        return out
+
         
-    def _load_suppliers(self, supplier_table="supplier_master"):
-        """Load supplier_master once (only if supplier_details=True)."""
+    def _load_suppliers(self, supplier_table="supplier_master", force: bool = False, fingerprint=None):
+        """
+        Load supplier_master once (only if supplier_details=True); force=True reloads it.
+        fingerprint: already computed by the caller (refresh), else fetched here.
+        """
         if self.engine is None:
             raise ValueError("supplier_details=True requires a DB engine.")
 
-        if self.supplier_df is None:
+        if self._parent is not None:
+            # partitions share the parent's supplier catalog
+            self._parent._load_suppliers(supplier_table, force)
+            if self.supplier_df is not self._parent.supplier_df:
+                self.supplier_table = self._parent.supplier_table
+                self.supplier_df = self._parent.supplier_df
+                self.supplier_terms = self._parent.supplier_terms
+                self.supplier_fingerprint = self._parent.supplier_fingerprint
+                self._bump_catalog_version("supplier")
+            return
+
+        if self.supplier_df is None or force:
+            self.supplier_table = supplier_table
+            self.supplier_fingerprint = fingerprint or self._table_fingerprint(supplier_table)
             self.supplier_df = pd.read_sql_query(
                 f"SELECT * FROM {supplier_table}",
                 self.engine
@@ -89,11 +704,12 @@ class ComponentMatcher:
                 .str.strip()
                 .tolist()
             )
+            self._bump_catalog_version("supplier")
 
-    
 
-    def find_components(self, texts, supplier_details: bool = False):
+    def find_components(self, texts, supplier_details: bool = False, match_mode: str = None):
         """
+        match_mode: overrides self.match_mode ("loop", "matrix", "aho" or "tfidf") for this call.
         Returns:
           components_df, suppliers_df
         suppliers_df is empty unless supplier_details=True.
@@ -102,16 +718,32 @@ class ComponentMatcher:
             texts = [texts]
 
         
-        keywords = []
-        for t in texts:
-            keywords.extend(self._extract_nouns(t))  
+        exact_matches = []
+        if self.exact_match:
+            texts, exact_matches = self._exact_pass(texts)
+
+        if (match_mode or self.match_mode) == "aho":
+            if supplier_details:
+                self._load_suppliers()
+            comp_pairs, supp_pairs = self._aho_match(texts, supplier_details)
+            comp_matches = self._matches_to_df(exact_matches + comp_pairs, self.df, "matched_component_text")
+            if supplier_details:
+                supp_matches = self._matches_to_df(supp_pairs, self.supplier_df, "matched_supplier_text")
+            else:
+                supp_matches = pd.DataFrame()
+            return comp_matches, supp_matches
+
+        keywords = self._extract_keywords(texts)
 
-        # identifying component matches
+        # identifying component matches (exact hits first, then fuzzy on the leftovers)
         comp_matches = self._fuzzy_match_to_df(
             keywords=keywords,
             choices=self.component_terms,
             base_df=self.df,
             matched_text_col="matched_component_text",
+            catalog="component",
+            match_mode=match_mode,
+            exact_matches=exact_matches,
         )
 
         # identifying supplier matches
@@ -122,45 +754,254 @@ class ComponentMatcher:
                 choices=self.supplier_terms,
                 base_df=self.supplier_df,
                 matched_text_col="matched_supplier_text",
+                catalog="supplier",
+                match_mode=match_mode,
             )
         else:
             supp_matches = pd.DataFrame()
 
         return comp_matches, supp_matches
 
-    def _fuzzy_match_to_df(self, keywords, choices, base_df, matched_text_col):
+    def _exact_pass(self, texts):
+        """
+        Hash pre-pass for explicit item IDs and exact component names.
+        Returns: (residual_texts, exact_matches)
+          exact_matches: [(matched_text, [(component_text, 100.0, row_index), ...]), ...]
+        """
+        residual_texts = []
+        exact_matches = []
+        for t in texts:
+            hits, residual = self.exact_index.scan(t)
+            residual_texts.append(residual)
+            for matched_text, row_ids in hits:
+                exact_matches.append(
+                    (matched_text, [(self.component_terms[i], 100.0, i) for i in row_ids[:self.top_k]])
+                )
+        return residual_texts, exact_matches
+
+    def _get_automaton(self) -> AhoCorasick:
+        """
+        One automaton over component names, part names and (if loaded) supplier names.
+        Rebuilt only when one of those catalogs was reloaded.
+        """
+        versions = (self.catalog_versions["component"], self.catalog_versions["supplier"], self.supplier_df is not None)
+        if self._automaton is None or self._automaton[0] != versions:
+            automaton = AhoCorasick()
+            for col in ("name", "internal_part_name"):
+                for row_id, value in enumerate(self.df[col]):
+                    if pd.notna(value):
+                        automaton.add(value, "component", row_id)
+            if self.supplier_df is not None:
+                for row_id, value in enumerate(self.supplier_df["supplier_name"]):
+                    if pd.notna(value):
+                        automaton.add(value, "supplier", row_id)
+            self._automaton = (versions, automaton.build())
+        return self._automaton[1]
+
+    def _aho_match(self, texts, supplier_details: bool = False):
+        """
+        Scans the concatenated transcript once for every catalog name.
+        Returns: (component_matches, supplier_matches) as (matched_text, [(term, 100.0, row_index), ...]) pairs
+        """
+        transcript = "\n".join(t for t in texts if t)
+        comp_pairs, supp_pairs = [], []
+        for start, end, _, payload in self._get_automaton().scan(transcript):
+            matched_text = transcript[start:end]
+            if "component" in payload:
+                rows = payload["component"][:self.top_k]
+                comp_pairs.append((matched_text, [(self.component_terms[i], 100.0, i) for i in rows]))
+            if supplier_details and "supplier" in payload:
+                rows = payload["supplier"][:self.top_k]
+                supp_pairs.append((matched_text, [(self.supplier_terms[i], 100.0, i) for i in rows]))
+        return comp_pairs, supp_pairs
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """
+        Persistent process pool shared by this matcher, its partitions and reloaded
+        copies. Started with forkserver (spawn where unavailable), never fork: the pool
+        is created lazily from a worker thread of a multi-threaded server.
+        """
+        if self._pool["executor"] is None:
+            methods = multiprocessing.get_all_start_methods()
+            ctx = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            self._pool["dir"] = tempfile.mkdtemp(prefix="matcher-pool-")
+            self._pool["executor"] = ProcessPoolExecutor(max_workers=self.parallel_workers, mp_context=ctx)
+        return self._pool["executor"]
+
+    def _pool_terms_file(self, catalog: str, choices: list[str]):
+        """
+        Writes a catalog's terms once per (matcher, catalog, version) for the pool workers,
+        which load and keep them on first use. Returns: (key, path prefix)
+        """
+        key = (self._uid, catalog, self.catalog_versions[catalog])
+        files = self._pool["files"]
+        path = files.get(key)
+        if path is None:
+            path = os.path.join(self._pool["dir"], "-".join(map(str, key)))
+            data, offsets = _pack_strings(choices)
+            np.save(f"{path}_data.npy", data)
+            np.save(f"{path}_offsets.npy", offsets)
+            files[key] = path
+            # old versions / evicted partitions; a worker still needing one falls back in-process
+            while len(files) > 2 * self.max_partitions + 4:
+                _, old = files.popitem(last=False)
+                for suffix in ("_data.npy", "_offsets.npy"):
+                    try:
+                        os.remove(old + suffix)
+                    except OSError:
+                        pass
+        else:
+            files.move_to_end(key)
+        return key, path
+
+    def _parallel_fuzzy_match(self, queries: list[str], catalog: str):
+        """
+        Splits the keywords into one shard per worker and merges the ranked results.
+        Same output as _best_fuzzy_match per keyword.
+        """
+        choices = self.component_terms if catalog == "component" else self.supplier_terms
+        pool = self._get_pool()
+        key, path = self._pool_terms_file(catalog, choices)
+        shards = [queries[i::self.parallel_workers] for i in range(self.parallel_workers)]
+        futures = [
+            (shard, pool.submit(_pool_match, key, path, shard, self.top_k, self.fuzzy_cutoff))
+            for shard in shards
+            if shard
+        ]
+        out = {}
+        for shard, future in futures:
+            try:
+                out.update(future.result())
+            except Exception:
+                # term file already rotated out, or the pool is shutting down
+                out.update({kw: self._best_fuzzy_match(kw, choices) for kw in shard})
+        return out
+
+    def close(self):
+        """Stops the shared matching pool (if any) and removes its term files."""
+        executor, directory = self._pool["executor"], self._pool["dir"]
+        self._pool["executor"] = self._pool["dir"] = None
+        self._pool["files"].clear()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if directory is not None:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def _tfidf_match(self, queries: list[str], choices: list[str], catalog: str):
+        """
+        Answers the queries with chunked sparse products against the catalog's TF-IDF matrix.
+        Returns: {query: [(best_match_text, score_0_100, index_in_choices), ...]}
+        """
+        if not queries or not choices:
+            return {q: [] for q in queries}
+        index = self._get_catalog_index("tfidf", catalog, choices)
+        ranked = index.query(queries, self.top_k, self.tfidf_cutoff)
+        return {
+            q: [(choices[i], round(score * 100, 2), i) for i, score in hits]
+            for q, hits in zip(queries, ranked)
+        }
+
+    @staticmethod
+    def _normalize_keyword(kw: str) -> str:
+        return " ".join(str(kw).split())
+
+    def _match_keywords(self, keywords, choices, catalog, match_mode=None):
+        """
+        Ranked matches for each unique (normalized) keyword.
+        Served from match_cache where possible; only the misses are scored.
+        Returns: {normalized_keyword: [(best_match_text, score, index_in_choices), ...]}
+        """
+        mode = match_mode or self.match_mode
+        if mode not in ("loop", "matrix", "tfidf"):
+            raise ValueError(f"Unknown match_mode: {mode}")
+
+        # loop and matrix give identical results, so they share cache entries
+        if mode == "tfidf":
+            settings = ("tfidf", self.top_k, self.tfidf_cutoff)
+        else:
+            settings = ("fuzzy", self.top_k, self.fuzzy_cutoff, self.prefilter)
+        key_prefix = (catalog, self.catalog_versions.get(catalog)) + settings
+        results = {}
+        misses = []
+        for kw in dict.fromkeys(self._normalize_keyword(k) for k in keywords):
+            cached = self.match_cache.get(key_prefix + (kw,))
+            if cached is None:
+                misses.append(kw)
+            else:
+                results[kw] = cached
+
+        if mode == "tfidf":
+            scored = self._tfidf_match(misses, choices, catalog)
+        elif self.prefilter and misses:
+            # shortlist per keyword, so the full-catalog matrix pass is skipped in either mode
+            index = self._get_catalog_index("trigram", catalog, choices)
+            scored = {
+                kw: self._best_fuzzy_match(kw, choices, index.candidates(kw, self.prefilter))
+                for kw in misses
+            }
+        elif self.parallel_workers > 0 and len(misses) >= self.parallel_min_keywords:
+            scored = self._parallel_fuzzy_match(misses, catalog)
+        elif mode == "matrix":
+            scored = self._matrix_fuzzy_match(misses, choices)
+        else:
+            scored = {kw: self._best_fuzzy_match(kw, choices) for kw in misses}
+
+        for kw, matches in scored.items():
+            self.match_cache.put(key_prefix + (kw,), matches)
+            results[kw] = matches
+        return results
+
+    def _fuzzy_match_to_df(self, keywords, choices, base_df, matched_text_col, match_mode=None, catalog="component", exact_matches=()):
         """
         Tiny wrapper so you don't duplicate fuzzy matching code.
-        Replace the inside with YOUR existing fuzzy match logic.
+        Scores each unique keyword once (loop / matrix / tfidf, via the match cache), then emits rows per keyword.
+        exact_matches: (keyword, matches) pairs from _exact_pass, emitted ahead of the fuzzy hits.
         Must return a DataFrame of matched rows + score + keyword + matched_text_col.
         """
-        hits = []
+        matches_by_kw = self._match_keywords(keywords, choices, catalog, match_mode=match_mode)
+        keyword_matches = list(exact_matches) + [
+            (kw, matches_by_kw[self._normalize_keyword(kw)]) for kw in keywords
+        ]
+        return self._matches_to_df(keyword_matches, base_df, matched_text_col)
 
-        for kw in keywords:
-            matches = self._best_fuzzy_match(kw, choices)
+    def _matches_to_df(self, keyword_matches, base_df, matched_text_col):
+        """
+        keyword_matches: [(keyword, [(matched_text, score, index_in_base_df), ...]), ...]
+        Returns: one row per hit = base_df row + matched_keyword / match_score / match_rank / matched_text_col / choice_index
+        """
+        keywords, scores, ranks, texts, indices = [], [], [], [], []
+        for kw, matches in keyword_matches:
             for rank, (best_match_text, score, idx) in enumerate(matches, start=1):
-                row = base_df.iloc[idx].to_dict()
-                row.update({
-                    "matched_keyword": kw,
-                    "match_score": score,
-                    "match_rank": rank,          
-                    matched_text_col: best_match_text,
-                    "choice_index": idx,         
-                })
-                hits.append(row)
-
-        return pd.DataFrame(hits)
-    
-    def build_child_parent_df(self, comp_df: pd.DataFrame, engine, table="machine_details", id_col="item"):
-        
+                keywords.append(kw)
+                scores.append(score)
+                ranks.append(rank)
+                texts.append(best_match_text)
+                indices.append(idx)
+
+        # one positional take for all hits instead of a row dict per hit
+        indices = np.asarray(indices, dtype=np.int64)
+        out = base_df.take(indices).reset_index(drop=True)
+        out["matched_keyword"] = keywords
+        out["match_score"] = np.asarray(scores, dtype=np.float64)
+        out["match_rank"] = np.asarray(ranks, dtype=np.int64)
+        out[matched_text_col] = texts
+        out["choice_index"] = indices
+        return out
+
+    def build_child_parent_df(self, comp_df: pd.DataFrame, engine=None, table="machine_details", id_col="item"):
+        """
+        Matched components (role=child) + every ancestor of each (role=parent).
+        Ancestor rows come from the in-memory hierarchy_index when `table` is the
+        catalog this matcher holds; any other table is still queried through `engine`.
+        """
+        if id_col not in comp_df.columns:
+            return pd.DataFrame()
         child_ids = comp_df[id_col].dropna().astype(str).unique().tolist()
         
         pairs = []
         parent_ids = set()
         for cid in child_ids:
-            parts = cid.split(".")
-            for k in range(1, len(parts)):  
-                pid = ".".join(parts[:k])
+            for pid in HierarchyIndex.ancestors(cid):
                 pairs.append((cid, pid))
                 parent_ids.add(pid)
         
@@ -169,8 +1010,13 @@ class ComponentMatcher:
         if not all_ids:
             return pd.DataFrame()
         
-        q = text(f"SELECT * FROM {table} WHERE {id_col} = ANY(:ids)")
-        all_rows = pd.read_sql(q, engine, params={"ids": all_ids})
+        in_memory = id_col == "item" and table in (self.machine_table, "machine_details")
+        if in_memory:
+            all_rows = self.df.take(self.hierarchy_index.row_ids(all_ids)).reset_index(drop=True)
+            all_rows[id_col] = all_rows[id_col].astype(str)
+        else:
+            q = text(f"SELECT * FROM {table} WHERE {id_col} = ANY(:ids)")
+            all_rows = pd.read_sql(q, engine, params={"ids": all_ids})
         
         children_df = (
             all_rows[all_rows[id_col].isin(child_ids)]
@@ -184,8 +1030,8 @@ class ComponentMatcher:
             .drop(columns=["parent_item_id"])
             .assign(role="parent")
         )
-        print('concating')
-        
         out = pd.concat([children_df, parents_df], ignore_index=True)
 
+        if in_memory:
+            out = self._attach_details(out)
         return out
@@ -6,12 +6,41 @@ from sqlalchemy import create_engine, text
 from pydantic import BaseModel
 from datetime import datetime
 from database import engine
+from MatchIndexes import HierarchyIndex, table_fingerprint
+import os
+import time
+import threading
 import uuid
 import traceback
 import logging
 
 logger = logging.getLogger(__name__)
 
+# In-memory machine_details hierarchy for the parents / children endpoints,
+# reloaded only when the table fingerprint changes
+HIERARCHY_CHECK_INTERVAL = float(os.getenv("HIERARCHY_CHECK_INTERVAL", "30"))
+_hierarchy = {"df": None, "index": None, "fingerprint": None, "checked_at": 0.0}
+_hierarchy_lock = threading.Lock()
+
+
+def get_hierarchy():
+    """Returns (machine_details df, HierarchyIndex), refreshed at most every HIERARCHY_CHECK_INTERVAL seconds."""
+    with _hierarchy_lock:
+        now = time.monotonic()
+        if _hierarchy["df"] is None or now - _hierarchy["checked_at"] >= HIERARCHY_CHECK_INTERVAL:
+            fingerprint = table_fingerprint(engine, "machine_details")
+            if fingerprint != _hierarchy["fingerprint"]:
+                df = pd.read_sql("SELECT * FROM machine_details", engine)
+                _hierarchy["df"] = df
+                _hierarchy["index"] = HierarchyIndex(df["item"].tolist())
+                _hierarchy["fingerprint"] = fingerprint
+            _hierarchy["checked_at"] = now
+        return _hierarchy["df"], _hierarchy["index"]
+
+
+def _hierarchy_rows(df, index, item_ids) -> List[dict]:
+    return df.take(index.row_ids(item_ids)).to_dict(orient="records")
+
 app = FastAPI(title="Item Retrieval API")
 
 # CORS middleware
@@ -106,11 +135,7 @@ async def get_item_parents(item_id: str):
     """Retrieve all parent items for a given item ID"""
     try:
         # Generate parent IDs from the item structure
-        parts = item_id.split('.')
-        parent_ids = []
-        
-        for i in range(1, len(parts)):
-            parent_ids.append('.'.join(parts[:i]))
+        parent_ids = HierarchyIndex.ancestors(item_id)
         
         if not parent_ids:
             return {
@@ -119,12 +144,8 @@ async def get_item_parents(item_id: str):
                 "data": []
             }
         
-        
-        placeholders = ','.join([f"'{pid}'" for pid in parent_ids])
-        query = f"SELECT * FROM machine_details WHERE item IN ({placeholders}) ORDER BY item"
-        
-        df = pd.read_sql(query, engine)
-        parents = df.to_dict(orient='records')
+        df, index = get_hierarchy()
+        parents = _hierarchy_rows(df, index, parent_ids)
         
         return {
             "success": True,
@@ -145,17 +166,9 @@ async def get_item_children(
 ):
     """Retrieve all child items for a given item ID"""
     try:
-        if direct_only:
-            # Only direct children (one level down)
-            query = f"SELECT * FROM machine_details WHERE item LIKE '{item_id}.%' AND item NOT LIKE '{item_id}.%.%'"
-        else:
-            # All descendants
-            query = f"SELECT * FROM machine_details WHERE item LIKE '{item_id}.%'"
-        
-        query += " ORDER BY item"
-        
-        df = pd.read_sql(query, engine)
-        children = df.to_dict(orient='records')
+        # direct_only: one level down, otherwise all descendants
+        df, index = get_hierarchy()
+        children = _hierarchy_rows(df, index, index.descendants(item_id, direct_only=direct_only))
         
         return {
             "success": True,
@@ -1,4 +1,4 @@
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
@@ -13,13 +13,23 @@ from sqlalchemy.exc import SQLAlchemyError
 
 from database import engine
 from SlackChannelReader import SlackChannelReader
-from ComponentMatcher import ComponentMatcher
+from MatcherService import MatcherService
+from ChannelWatermarks import ChannelWatermarks, newest_ts
+from SlackRateLimiter import get_rate_limiter
+from SlackUserDirectory import get_user_directory
+from SlackEventBuffer import SlackEventBuffer, verify_slack_signature
 from OpenRouterClient import OpenRouterClient
+from LLMResponseCache import get_llm_cache
 from PromptDigest import get_manufacturing_digest_prompt, parse_llm_output, get_supplier_digest_prompt
 
 import time
 import uuid
+from decimal import Decimal, ROUND_DOWN
+import json
+import asyncio
+import threading
 import logging
+from contextlib import asynccontextmanager
 
 logger = logging.getLogger("digest")
 logging.basicConfig(level=logging.INFO)
@@ -28,11 +38,96 @@ logging.basicConfig(level=logging.INFO)
 # Load environment variables
 load_dotenv()
 
+# One warm ComponentMatcher per process, rebuilt only when machine_details changes
+matcher_service = MatcherService(
+    engine=engine,
+    batch_size=int(os.getenv("MATCHER_NLP_BATCH_SIZE", "256")),
+    n_process=int(os.getenv("MATCHER_NLP_PROCESSES", "1")),
+    match_mode=os.getenv("MATCHER_MODE", "loop"),
+    top_k=int(os.getenv("MATCHER_TOP_K", "5")),
+    fuzzy_cutoff=float(os.getenv("MATCHER_FUZZY_CUTOFF", "50")),
+    cache_size=int(os.getenv("MATCHER_CACHE_SIZE", "10000")),
+    cache_ttl=float(os.getenv("MATCHER_CACHE_TTL")) if os.getenv("MATCHER_CACHE_TTL") else None,
+    prefilter=int(os.getenv("MATCHER_PREFILTER", "0")),
+    extractor=os.getenv("MATCHER_EXTRACTOR", "spacy"),
+    rebuild_cache_dir=os.getenv("MATCHER_REBUILD_CACHE_DIR") or os.getenv("MATCHER_ARTIFACT_DIR") or None,
+    parallel_workers=int(os.getenv("MATCHER_PARALLEL_WORKERS", "0")),
+    parallel_min_keywords=int(os.getenv("MATCHER_PARALLEL_MIN_KEYWORDS", "200")),
+    max_partitions=int(os.getenv("MATCHER_MAX_PARTITIONS", "16")),
+)
+
+
+# Optional per-channel BOM partition, e.g. {"C0123": {"product": "Warehouse Robot", "version": "V16"}}
+CHANNEL_PARTITIONS = json.loads(os.getenv("DIGEST_CHANNEL_PARTITIONS") or "{}")
+
+# Last digested Slack ts per channel, so overlapping polls only see new messages
+watermarks = ChannelWatermarks(engine)
+
+# Max conversations_replies calls in flight when include_replies is set
+SLACK_REPLY_CONCURRENCY = int(os.getenv("SLACK_REPLY_CONCURRENCY", "8"))
+
+# Message events pushed by Slack to /api/slack/events; digests with source=buffer read from here.
+# Acked events exist only in this directory until digested: put it on persistent storage
+# (docker-compose mounts a volume); the default sits next to this file, not in the cwd.
+event_buffer = SlackEventBuffer(
+    os.getenv("SLACK_EVENT_BUFFER_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "slack_event_buffer")
+)
+# Slack always signs its requests; without a secret /api/slack/events rejects
+# everything unless SLACK_EVENTS_ALLOW_UNSIGNED=1 (local replay only)
+SLACK_SIGNING_SECRET = os.getenv("SLACK_SIGNING_SECRET")
+SLACK_EVENTS_ALLOW_UNSIGNED = os.getenv("SLACK_EVENTS_ALLOW_UNSIGNED") == "1"
+
+# Upper bounds of one watermark catch-up (minutes after the mark, messages), so a
+# channel paused for days is digested in bounded prompts over several polls
+DIGEST_MAX_CATCHUP_MINUTES = int(os.getenv("DIGEST_MAX_CATCHUP_MINUTES", "1440"))
+DIGEST_MAX_MESSAGES = int(os.getenv("DIGEST_MAX_MESSAGES", "500"))
+
+# Channels digested at once by /api/digest/channels
+DIGEST_CHANNEL_CONCURRENCY = int(os.getenv("DIGEST_CHANNEL_CONCURRENCY", "4"))
+
+# Serialises find_components on the shared matcher across digest threads
+match_lock = threading.Lock()
+
+# One pooled OpenRouter client per API key, reused by every digest
+llm_clients = {}
+llm_clients_lock = threading.Lock()
+
+
+def get_llm_client(api_key) -> OpenRouterClient:
+    """Shared keep-alive OpenRouterClient, sized for the concurrent multi-channel digests."""
+    with llm_clients_lock:
+        client = llm_clients.get(api_key)
+        if client is None:
+            client = llm_clients[api_key] = OpenRouterClient(
+                api_key, pool_size=max(DIGEST_CHANNEL_CONCURRENCY, 4), cache=get_llm_cache()
+            )
+        return client
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        matcher_service.warm_up()
+    except Exception as e:
+        # DB may not be up yet; the first /api/digest call will retry the load
+        logger.warning(f"matcher warm-up failed: {e}")
+    if os.getenv("SLACK_TOKEN"):
+        # users_list sweep in the background, so the first digest does not wait for it
+        reader = SlackChannelReader()
+        if reader.users.needs_refresh():
+            reader.users.refresh_async(reader.client)
+    yield
+    matcher_service.close()
+    for client in llm_clients.values():
+        client.close()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Slack Manufacturing Digest API",
     description="API for extracting and summarizing Slack manufacturing discussions",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Enable CORS for React frontend
@@ -53,6 +148,17 @@ class DigestResponse(BaseModel):
     discussions: Optional[list] = None
     error: Optional[str] = None
 
+class ChannelDigestResponse(DigestResponse):
+    channel_id: str
+    timings: Optional[dict] = None
+
+class MultiDigestResponse(BaseModel):
+    success: bool
+    message: str
+    channels: list[ChannelDigestResponse] = []
+    total_seconds: Optional[float] = None
+    error: Optional[str] = None
+
 class DiscussionSummaryUpdateRequest(BaseModel):
     discussion_id: str  # Will be converted to int for database query
     item_id: str
@@ -73,6 +179,156 @@ def root():
     return {"status": "ok", "message": "Slack Digest API is running"}
 
 
+def digest_messages(channel, messages, high_water, supplier_search=False, match_mode=None,
+                    product=None, version=None, incremental=True, or_api_key=None,
+                    trace_id="", timings=None, use_llm_cache=True, after_ts=None):
+    """
+    Match components in already fetched messages, summarise them with the LLM and
+    store the discussions. Shared by the single and multi-channel endpoints.
+
+    timings: optional dict filled with match_seconds / llm_seconds.
+    use_llm_cache: False forces a fresh LLM answer even if this exact prompt is cached.
+    after_ts: watermark the messages were read after; with incremental the range
+              (after_ts, high_water] is claimed first, so an overlapping poll that read
+              the same range returns without calling the LLM or storing anything.
+    """
+    if timings is None:
+        timings = {}
+    # explicit product/version wins over the channel mapping.
+    # A BOM reload swaps in a new matcher, so this digest keeps the snapshot it took;
+    # the BOM check itself runs in the background, never under match_lock.
+    partition = CHANNEL_PARTITIONS.get(channel, {})
+    snapshot = matcher_service.get_matcher()
+    try:
+        with match_lock:
+            matcher = snapshot.partition(
+                product=product or partition.get("product"),
+                version=version or partition.get("version"),
+            )
+    except ValueError as e:
+        # unknown product / version: nothing claimed, nothing cached
+        return DigestResponse(success=False, message="Unknown product / version", error=str(e))
+
+    claimed = claim_watermark(channel, after_ts, high_water, trace_id) if incremental else None
+    if claimed is False:
+        return DigestResponse(
+            success=True,
+            message="Messages already claimed by an overlapping digest",
+            message_count=0,
+            component_count=0,
+            discussions=[]
+        )
+    try:
+        return _digest_claimed(
+            channel, messages, high_water, claimed, matcher, after_ts=after_ts,
+            supplier_search=supplier_search, match_mode=match_mode,
+            incremental=incremental, or_api_key=or_api_key,
+            trace_id=trace_id, timings=timings, use_llm_cache=use_llm_cache,
+        )
+    except Exception:
+        if claimed:
+            release_watermark(channel, high_water, after_ts, trace_id)
+        raise
+
+
+def _digest_claimed(channel, messages, high_water, claimed, matcher, after_ts=None, supplier_search=False,
+                    match_mode=None, incremental=True, or_api_key=None,
+                    trace_id="", timings=None, use_llm_cache=True):
+    """Body of digest_messages once the range is claimed (claimed=None: no claim, advance afterwards)."""
+    print("step 1")
+    message_texts = [msg["text"] for msg in messages if msg["text"]]
+
+    # Find Matching Components
+    # the warm matcher is shared; channels digested in parallel take turns here
+    start = time.perf_counter()
+    with match_lock:
+        if supplier_search == True:
+            comp_df, supp_df =  matcher.find_components(message_texts, supplier_details=True, match_mode=match_mode)
+        else:
+            comp_df, supp_df =  matcher.find_components(message_texts, supplier_details=False, match_mode=match_mode)
+        results_df = matcher.build_child_parent_df(comp_df, engine)
+    timings["match_seconds"] = round(time.perf_counter() - start, 4)
+    print("step 2")
+    if results_df.empty and (supp_df.empty if supplier_search else True):
+        # nothing to summarise, but these messages are done
+        if incremental:
+            if claimed is None:
+                advance_watermark(channel, high_water, trace_id)
+            compact_buffer(channel, high_water, trace_id)
+        return DigestResponse(
+            success=True,
+            message="No components found in messages",
+            message_count=len(messages),
+            component_count=0,
+            discussions=[]
+        )
+
+    #results_df.to_csv("matched_components.csv", index=False)
+    # if supplier_search and not supp_df.empty:
+    #     supp_df.to_csv("matched_suppliers.csv", index=False)
+
+    #Generate discussion digest using LLM
+    start = time.perf_counter()
+    if supplier_search == False:
+        prompt = get_manufacturing_digest_prompt(messages, results_df.to_markdown(index=False))
+        orclient = get_llm_client(or_api_key)
+        response = orclient.send_message(message = prompt, use_cache=use_llm_cache)
+        llm_output = orclient.get_response_text(response)
+    else:
+        prompt = get_supplier_digest_prompt(messages, component_details = results_df.to_markdown(index=False), supplier_details=supp_df.to_markdown(index=False))
+        orclient = get_llm_client(or_api_key)
+        response = orclient.send_message(message = prompt, use_cache=use_llm_cache)
+        llm_output = orclient.get_response_text(response)
+    timings["llm_seconds"] = round(time.perf_counter() - start, 4)
+    if llm_output is None:
+        # API error or empty answer: nothing to store, the range stays due
+        if claimed:
+            release_watermark(channel, high_water, after_ts, trace_id)
+        return DigestResponse(
+            success=False,
+            message="LLM request failed",
+            message_count=len(messages),
+            error=str(response.get("error", "No content in LLM response")) if isinstance(response, dict) else None
+        )
+    parsed_data = parse_llm_output(llm_output)
+    discussions_df = pd.DataFrame(parsed_data)
+    discussions_df['created_at'] = datetime.now()
+
+    print("step 3")
+    try:
+        discussions_df.to_sql(
+                                name='discussion_summary',
+                                con=engine,
+                                if_exists='append',
+                                index=False)
+        # only after the summaries are stored, so a failed run is retried next poll
+        if incremental:
+            if claimed is None:
+                advance_watermark(channel, high_water, trace_id)
+            compact_buffer(channel, high_water, trace_id)
+    except:
+        print("DB operation failed")
+        if claimed:
+            # nothing stored; hand the range back so the next poll retries it
+            release_watermark(channel, high_water, after_ts, trace_id)
+
+    #discussions_df.to_csv('discussions.csv', index=False)
+
+    print("done processing")
+
+    # Convert to list of dicts for JSON response
+    #discussions_list = discussions_df.to_dict('records')
+
+    discussions_list = []
+    return DigestResponse(
+        success=True,
+        message="Digest generated successfully",
+        message_count=len(messages),
+        component_count=len(results_df),
+        discussions=discussions_list
+    )
+
+
 @app.get("/api/digest", response_model=DigestResponse)
 async def get_digest(
     channel_id: Optional[str] = Query(None, description="Slack Channel ID"),
@@ -80,6 +336,13 @@ async def get_digest(
     lookback_minutes: Optional[int] = Query(20, description="How many minutes to look back", ge=1, le=1440),
     csv_path: Optional[str] = Query(None, description="Path to BOM CSV file"),
     supplier_search: bool = Query(False, description="If true, also search supplier_name and primary_contact_name"),
+    match_mode: Optional[str] = Query(None, description="Override matching engine: loop, matrix, aho or tfidf"),
+    product: Optional[str] = Query(None, description="Only match components of this machine_details product"),
+    version: Optional[str] = Query(None, description="Only match components of this machine_details version"),
+    include_replies: bool = Query(False, description="Also fetch thread replies of threaded messages"),
+    incremental: bool = Query(True, description="Only digest messages newer than the channel's last processed ts (lookback_minutes applies on the first run)"),
+    source: str = Query("slack", description="slack = read conversations_history, buffer = messages received on /api/slack/events"),
+    llm_cache: bool = Query(True, description="Reuse the cached LLM answer for an identical prompt (false forces a fresh call)"),
     debug: bool = Query(False, description="Return debug info")
 ):
     """
@@ -126,12 +389,19 @@ async def get_digest(
                 error="OPEN_ROUTER_API_KEY not found in .env file"
             )
         
+        after_ts = await asyncio.to_thread(lookup_watermark, channel, trace_id) if incremental else None
+
         # Extract messages from Slack
         slack_reader = SlackChannelReader(token=token, default_channel_id=channel)
         try:
-            messages = slack_reader.extract_messages(channel_id=channel, lookback_minutes=lookback_minutes, print_output=debug)
+            # rate-limit waits and Retry-After sleeps block, so they run off the event loop
+            messages, high_water = await asyncio.to_thread(read_messages, slack_reader, channel, lookback_minutes, after_ts, source=source, print_output=debug)
+            # replies are not covered by the channel watermark, only top-level history is
+            # buffered events already contain thread replies
+            if include_replies and source != "buffer":
+                messages = await slack_reader.expand_threads(messages, channel_id=channel, max_concurrency=SLACK_REPLY_CONCURRENCY)
 
-            logger.info(f"[{trace_id}] slack extracted={len(messages)}")
+            logger.info(f"[{trace_id}] slack extracted={len(messages)} after_ts={after_ts}")
 
             if debug:
                 safe_token = (token[-6:] if token else None)
@@ -143,6 +413,7 @@ async def get_digest(
                         "channel": channel,
                         "lookback_minutes": lookback_minutes,
                         "oldest_epoch": oldest,
+                        "after_ts": after_ts,
                         "token_suffix": safe_token,
                         "extracted_count": len(messages),
                         "first_ts": (messages[0]["timestamp"] if messages else None),
@@ -163,77 +434,35 @@ async def get_digest(
                 error=f"Unexpected error: {str(e)}"
             )
         
+        if not messages and after_ts:
+            if incremental and high_water:
+                # an empty catch-up window: skip past it
+                await asyncio.to_thread(advance_watermark, channel, high_water, trace_id)
+            return DigestResponse(
+                success=True,
+                message="No new messages",
+                message_count=0,
+                component_count=0,
+                discussions=[]
+            )
         if not messages:
             return DigestResponse(
                 success=False,
                 message="No messages found",
                 error=f"No messages found in channel {channel} from the last {lookback_minutes} minutes. This could mean: 1) There are no messages in this time window, 2) All messages were filtered out (system messages), or 3) The channel exists but is empty in this time range."
             )
-        print("step 1")
-        message_texts = [msg["text"] for msg in messages if msg["text"]]
-        matcher = ComponentMatcher(engine=engine)
-        
-        
-        # Find Matching Components
-        if supplier_search == True:
-            comp_df, supp_df =  matcher.find_components(message_texts, supplier_details=True)
-        else:
-            comp_df, supp_df =  matcher.find_components(message_texts, supplier_details=False)
-        results_df = matcher.build_child_parent_df(comp_df, engine)
-        print("step 2")
-        if results_df.empty and (supp_df.empty if supplier_search else True):
-            return DigestResponse(
-                success=True,
-                message="No components found in messages",
-                message_count=len(messages),
-                component_count=0,
-                discussions=[]
-            )
-        
-        #results_df.to_csv("matched_components.csv", index=False)
-        # if supplier_search and not supp_df.empty:
-        #     supp_df.to_csv("matched_suppliers.csv", index=False)
-        
-        #Generate discussion digest using LLM
-        if supplier_search == False:
-            prompt = get_manufacturing_digest_prompt(messages, results_df.to_markdown(index=False))
-            orclient = OpenRouterClient(or_api_key)
-            response = orclient.send_message(message = prompt)
-            llm_output = orclient.get_response_text(response)
-            parsed_data = parse_llm_output(llm_output)
-        else:
-            prompt = get_supplier_digest_prompt(messages, component_details = results_df.to_markdown(index=False), supplier_details=supp_df.to_markdown(index=False))
-            orclient = OpenRouterClient(or_api_key)
-            response = orclient.send_message(message = prompt)
-            llm_output = orclient.get_response_text(response)
-            parsed_data = parse_llm_output(llm_output)
-        discussions_df = pd.DataFrame(parsed_data)
-        discussions_df['created_at'] = datetime.now()
-        
-        print("step 3")
-        try:
-            discussions_df.to_sql(
-                                    name='discussion_summary',
-                                    con=engine,
-                                    if_exists='append',
-                                    index=False)
-        except:
-            print("DB operation failed")
-        
-        #discussions_df.to_csv('discussions.csv', index=False)
-
-        print("done processing")
-        
-        # Convert to list of dicts for JSON response
-        #discussions_list = discussions_df.to_dict('records')
-        
-        discussions_list = []
-        return DigestResponse(
-            success=True,
-            message="Digest generated successfully",
-            message_count=len(messages),
-            component_count=len(results_df),
-            discussions=discussions_list
+        # LLM call and DB write run off the event loop so other requests are not stalled
+        return await asyncio.to_thread(
+            digest_messages, channel, messages, high_water,
+            supplier_search=supplier_search,
+            match_mode=match_mode,
+            product=product,
+            version=version,
+            incremental=incremental,
+            or_api_key=or_api_key,
+            trace_id=trace_id,
+            use_llm_cache=llm_cache,
+            after_ts=after_ts,
         )
         
     except FileNotFoundError as e:
@@ -251,6 +480,251 @@ async def get_digest(
             error=str(e)
         )
 
+@app.get("/api/digest/channels", response_model=MultiDigestResponse)
+async def get_multi_channel_digest(
+    channel_ids: Optional[str] = Query(None, description="Comma separated Slack Channel IDs (falls back to DIGEST_CHANNELS)"),
+    slack_token: Optional[str] = Query(None, description="Slack Bot Token"),
+    lookback_minutes: Optional[int] = Query(20, description="How many minutes to look back", ge=1, le=1440),
+    supplier_search: bool = Query(False, description="If true, also search supplier_name and primary_contact_name"),
+    match_mode: Optional[str] = Query(None, description="Override matching engine: loop, matrix, aho or tfidf"),
+    include_replies: bool = Query(False, description="Also fetch thread replies of threaded messages"),
+    incremental: bool = Query(True, description="Only digest messages newer than each channel's last processed ts"),
+    source: str = Query("slack", description="slack = read conversations_history, buffer = messages received on /api/slack/events"),
+    llm_cache: bool = Query(True, description="Reuse the cached LLM answer for an identical prompt (false forces a fresh call)"),
+):
+    """
+    Digest several channels in one run. Channels are fetched and summarised
+    concurrently (at most DIGEST_CHANNEL_CONCURRENCY at a time) behind the shared
+    per-workspace Slack rate limiter and warm matcher; each channel reports its own result and timings.
+    Product/version partitions come from DIGEST_CHANNEL_PARTITIONS.
+    """
+    token = slack_token or os.getenv("SLACK_TOKEN")
+    or_api_key = os.getenv("OPEN_ROUTER_API_KEY")
+    channels = [c.strip() for c in (channel_ids or os.getenv("DIGEST_CHANNELS", "")).split(",") if c.strip()]
+    channels = list(dict.fromkeys(channels))
+
+    if not token:
+        return MultiDigestResponse(success=False, message="Slack token not provided", error="SLACK_TOKEN not found in request or .env file")
+    if not channels:
+        return MultiDigestResponse(success=False, message="Channel IDs not provided", error="channel_ids not given and DIGEST_CHANNELS not set")
+    if not or_api_key:
+        return MultiDigestResponse(success=False, message="OpenRouter API key not found", error="OPEN_ROUTER_API_KEY not found in .env file")
+
+    trace_id = str(uuid.uuid4())[:8]
+    logger.info(f"[{trace_id}] /api/digest/channels channels={channels} lookback={lookback_minutes}")
+    semaphore = asyncio.Semaphore(max(1, DIGEST_CHANNEL_CONCURRENCY))
+
+    async def run_channel(channel):
+        async with semaphore:
+            timings = {}
+            start = time.perf_counter()
+            try:
+                after_ts = await asyncio.to_thread(lookup_watermark, channel, trace_id) if incremental else None
+                reader = SlackChannelReader(token=token, default_channel_id=channel)
+                messages, high_water = await asyncio.to_thread(read_messages, reader, channel, lookback_minutes, after_ts, source=source)
+                if include_replies and source != "buffer":
+                    messages = await reader.expand_threads(messages, channel_id=channel, max_concurrency=SLACK_REPLY_CONCURRENCY)
+                timings["fetch_seconds"] = round(time.perf_counter() - start, 4)
+
+                if not messages:
+                    if incremental and after_ts and high_water:
+                        await asyncio.to_thread(advance_watermark, channel, high_water, trace_id)
+                    result = DigestResponse(success=True, message="No new messages", message_count=0, component_count=0, discussions=[])
+                else:
+                    result = await asyncio.to_thread(
+                        digest_messages, channel, messages, high_water,
+                        supplier_search=supplier_search,
+                        match_mode=match_mode,
+                        incremental=incremental,
+                        or_api_key=or_api_key,
+                        trace_id=trace_id,
+                        timings=timings,
+                        use_llm_cache=llm_cache,
+                        after_ts=after_ts,
+                    )
+            except ValueError as e:
+                result = DigestResponse(success=False, message="Error fetching messages from Slack", error=str(e))
+            except Exception as e:
+                logger.exception(f"[{trace_id}] digest failed for channel {channel}")
+                result = DigestResponse(success=False, message="An error occurred", error=str(e))
+
+            timings["total_seconds"] = round(time.perf_counter() - start, 4)
+            logger.info(f"[{trace_id}] channel={channel} {result.message} timings={timings}")
+            return ChannelDigestResponse(channel_id=channel, timings=timings, **result.model_dump())
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(run_channel(c) for c in channels))
+    failed = sum(not r.success for r in results)
+    return MultiDigestResponse(
+        success=failed == 0,
+        message=f"Digested {len(results) - failed} of {len(results)} channels",
+        channels=results,
+        total_seconds=round(time.perf_counter() - start, 4),
+    )
+
+
+def read_messages(reader, channel, lookback_minutes, after_ts, source="slack", print_output=False):
+    """
+    Parsed messages newer than after_ts (else within lookback_minutes), from Slack history or the event buffer.
+
+    A watermark catch-up is bounded: at most DIGEST_MAX_CATCHUP_MINUTES after after_ts and
+    at most DIGEST_MAX_MESSAGES messages (the oldest ones) per digest; later polls take the rest.
+
+    Returns:
+        (messages newest first, high_water): high_water is the ts the channel can advance to once
+        these messages are digested; for a capped window that is the window's end, so empty
+        stretches of history are skipped too.
+    """
+    window_end = None
+    if after_ts:
+        end = Decimal(after_ts) + Decimal(DIGEST_MAX_CATCHUP_MINUTES * 60)
+        if end < Decimal(str(time.time())):
+            window_end = format(end.quantize(Decimal("0.000001"), rounding=ROUND_DOWN), "f")
+
+    if source == "buffer":
+        raw = event_buffer.read(channel, after_ts=after_ts, oldest=time.time() - lookback_minutes * 60)
+        messages = reader.parse_messages(raw, print_output=print_output)
+    else:
+        # `latest` is exclusive like `oldest`; one microsecond past the end, trimmed below
+        latest = str(Decimal(window_end) + Decimal("0.000001")) if window_end else None
+        messages = reader.extract_messages(channel_id=channel, lookback_minutes=lookback_minutes,
+                                           print_output=print_output, after_ts=after_ts, latest=latest)
+
+    if window_end:
+        messages = [m for m in messages if Decimal(m["timestamp"]) <= Decimal(window_end)]
+    if after_ts and len(messages) > DIGEST_MAX_MESSAGES:
+        # oldest first; the newer ones stay above the watermark for the next poll
+        messages = sorted(messages, key=lambda m: Decimal(m["timestamp"]), reverse=True)[-DIGEST_MAX_MESSAGES:]
+        return messages, newest_ts(messages)
+    return messages, window_end or newest_ts(messages)
+
+
+def compact_buffer(channel, high_water, trace_id):
+    """
+    Drop buffered events up to high_water once its digest is stored. Only called
+    after a successful store: a claim alone moves the watermark before anything is
+    committed, so compacting up to the watermark at read time could lose a range
+    whose digest later fails and is released.
+    """
+    if high_water is None:
+        return
+    try:
+        event_buffer.compact(channel, high_water)
+    except OSError as e:
+        # the events stay and are filtered by the watermark; compaction only saves space
+        logger.warning(f"[{trace_id}] could not compact event buffer for {channel}: {e}")
+
+
+def lookup_watermark(channel, trace_id):
+    """Channel's last digested ts, or None (first run / DB trouble) to fall back to the lookback window."""
+    try:
+        return watermarks.get(channel)
+    except SQLAlchemyError as e:
+        logger.warning(f"[{trace_id}] watermark lookup failed, using lookback window: {e}")
+        return None
+
+
+def claim_watermark(channel, after_ts, high_water, trace_id):
+    """
+    Claim (after_ts, high_water] for this poll: True = claimed, False = an overlapping
+    poll got there first, None = not claimed (no ts / DB trouble; advanced after storing instead).
+    """
+    if high_water is None:
+        return None
+    try:
+        return watermarks.claim(channel, after_ts, high_water)
+    except SQLAlchemyError as e:
+        logger.warning(f"[{trace_id}] could not claim watermark for {channel}: {e}")
+        return None
+
+
+def release_watermark(channel, claimed_ts, previous_ts, trace_id):
+    """Give a claimed range back after a failed digest, so the next poll retries it."""
+    try:
+        watermarks.release(channel, claimed_ts, previous_ts)
+    except SQLAlchemyError as e:
+        logger.warning(f"[{trace_id}] could not release watermark for {channel}: {e}")
+
+
+def advance_watermark(channel, ts, trace_id):
+    """Record `ts` as the channel's last digested message; failures only cost a re-read."""
+    if ts is None:
+        return
+    try:
+        watermarks.advance(channel, ts)
+    except SQLAlchemyError as e:
+        logger.warning(f"[{trace_id}] could not advance watermark for {channel}: {e}")
+
+
+@app.post("/api/slack/events")
+async def slack_events(request: Request):
+    """
+    Slack Events API receiver: answers the url_verification handshake and appends
+    message events to the local event buffer. Only the append happens before the
+    ack, so Slack's 3 second deadline is never at risk.
+    """
+    body = await request.body()
+    if not SLACK_SIGNING_SECRET and not SLACK_EVENTS_ALLOW_UNSIGNED:
+        raise HTTPException(
+            status_code=403,
+            detail="SLACK_SIGNING_SECRET not configured (set SLACK_EVENTS_ALLOW_UNSIGNED=1 for local replay)",
+        )
+    if SLACK_SIGNING_SECRET and not verify_slack_signature(
+        SLACK_SIGNING_SECRET,
+        body,
+        request.headers.get("X-Slack-Request-Timestamp"),
+        request.headers.get("X-Slack-Signature"),
+    ):
+        raise HTTPException(status_code=401, detail="Invalid Slack signature")
+
+    try:
+        payload = json.loads(body or b"{}")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body is not JSON")
+
+    if payload.get("type") == "url_verification":
+        return {"challenge": payload.get("challenge")}
+
+    stored = False
+    if payload.get("type") == "event_callback":
+        stored = await asyncio.to_thread(event_buffer.append, payload.get("event") or {})
+    return {"ok": True, "stored": stored}
+
+
+@app.get("/api/matcher/stats")
+def matcher_stats():
+    """Warm matcher hit / rebuild metrics"""
+    return matcher_service.stats()
+
+
+@app.get("/api/slack/stats")
+def slack_stats():
+    """Per-method call / throttle / 429 retry counters and user cache stats for the .env workspace"""
+    token = os.getenv("SLACK_TOKEN")
+    if not token:
+        raise HTTPException(status_code=404, detail="SLACK_TOKEN not configured")
+    return {
+        "rate_limits": get_rate_limiter(token).stats(),
+        "user_directory": get_user_directory(token).stats(),
+    }
+
+
+@app.get("/api/llm/cache/stats")
+def llm_cache_stats():
+    """Hit / miss / eviction counters of the LLM response cache (LLM_CACHE_PATH)"""
+    cache = get_llm_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+@app.post("/api/matcher/refresh")
+def matcher_refresh():
+    """Force the matcher to reload machine_details on the next digest"""
+    matcher_service.invalidate()
+    return {"success": True}
+
+
 @app.put("/api/discussion-summary")
 async def update_discussion_summary(payload: DiscussionSummaryUpdateRequest):
     """
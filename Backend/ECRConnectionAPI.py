@@ -1,12 +1,13 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
 from sqlalchemy.orm import Session
 from database import engine
 from PromptDigest import get_ecr_editing_prompt
-from OpenRouterClient import OpenRouterClient
+from OpenRouterClient import AsyncOpenRouterClient
+from LLMResponseCache import get_llm_cache
 import os
 import uuid
 from dotenv import load_dotenv
@@ -15,6 +16,7 @@ import json
 from datetime import datetime
 from sqlalchemy import text
 from pathlib import Path
+from contextlib import asynccontextmanager
 
 
 # Load environment variables
@@ -25,7 +27,27 @@ DOC_DIR  = BASE_DIR / "ECR_document_store"          # Backend/ECR_document_store
 DOC_DIR.mkdir(parents=True, exist_ok=True)
 
 
-app = FastAPI()
+# One pooled async OpenRouter client for the app, created on the first ECR request
+llm_client = None
+
+
+def get_llm_client(api_key) -> AsyncOpenRouterClient:
+    global llm_client
+    if llm_client is None or llm_client.api_key != api_key:
+        llm_client = AsyncOpenRouterClient(
+            api_key, pool_size=int(os.getenv("OPENROUTER_POOL_SIZE", "10")), cache=get_llm_cache()
+        )
+    return llm_client
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    if llm_client is not None:
+        await llm_client.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Enable CORS for React frontend
 app.add_middleware(
@@ -48,6 +70,154 @@ class ECRCreationResponse(BaseModel):
 class ECRCreationRequest(BaseModel):
     discussion_ids: List[int]
     additional_details: str
+    # False regenerates even when the same discussions + details were answered before
+    use_llm_cache: bool = True
+
+def build_ecr_prompt(request: ECRCreationRequest):
+    """
+    Load the selected discussions and their component from the DB and build the ECR prompt.
+    Returns: (system_prompt, user_prompt, component_id)
+    """
+    with Session(engine) as session:
+
+
+        # Get discussion summaries, latest updates, and component_ids
+        discussion_data = []
+        component_ids = set()
+
+        for discussion_id in request.discussion_ids:
+            query = text("""
+                SELECT summary, latest_update, item_id 
+                FROM discussion_summary 
+                WHERE id = :discussion_id
+            """)
+            result = session.execute(query, {"discussion_id": discussion_id}).fetchone()
+
+            if result:
+                discussion_data.append({
+                    "discussion_summary": result[0],
+                    "latest_update": result[1],
+                    "component_id": result[2]
+                })
+                component_ids.add(result[2])
+
+        if not discussion_data:
+            raise HTTPException(status_code=404, detail="No discussions found for provided IDs")
+
+        # Combine all discussion summaries and latest updates
+        combined_discussion_summaries = "\\n\\n".join([d["discussion_summary"] for d in discussion_data])
+        combined_latest_updates = "\\n\\n".join([d["latest_update"] for d in discussion_data])
+
+        # Assuming all discussions are for the same component (take first component_id)
+        component_id = list(component_ids)[0]
+
+        # Fetch component details from machine_details table
+        component_query = text("""
+            SELECT product, version, name, internal_part_name, 
+                   quantity, material, category, mass, length, 
+                   tessellation_quality, finish, notes
+            FROM machine_details
+            WHERE item = :component_id
+        """)
+        component_result = session.execute(component_query, {"component_id": component_id}).fetchone()
+
+        if not component_result:
+            raise HTTPException(status_code=404, detail=f"Component details not found for component_id: {component_id}")
+
+        # Extract component details
+        product = component_result[0] or ""
+        version = component_result[1] or ""
+        component_name = component_result[2] or ""
+        internal_part_name = component_result[3] or ""
+        quantity = component_result[4] or ""
+        material = component_result[5] or ""
+        category = component_result[6] or ""
+        mass = component_result[7] or ""
+        length = component_result[8] or ""
+        tessellation_quality = component_result[9] or ""
+        finish = component_result[10] or ""
+        notes = component_result[11] or ""
+
+
+    system_prompt, user_prompt = get_ecr_editing_prompt(
+        discussion_summaries=combined_discussion_summaries,
+        latest_updates=combined_latest_updates,
+        component_id=str(component_id),
+        additional_details=request.additional_details,
+        product=product,
+        version=version,
+        component_name=component_name,
+        internal_part_name=internal_part_name,
+        quantity=quantity,
+        material=material,
+        category=category,
+        mass=mass,
+        length=length,
+        tessellation_quality=tessellation_quality,
+        finish=finish,
+        notes=notes
+    )
+    return system_prompt, user_prompt, component_id
+
+
+def store_ecr(llm_output: str, component_id) -> str:
+    """
+    Parse the LLM's ECR JSON, render the Word document and record it in ecr_database.
+    Returns: document_id
+    """
+    try:
+        # Clean the response in case there's markdown formatting
+        llm_output_clean = llm_output.strip()
+        if llm_output_clean.startswith("```json"):
+            llm_output_clean = llm_output_clean.split("```json")[1]
+        if llm_output_clean.endswith("```"):
+            llm_output_clean = llm_output_clean.rsplit("```", 1)[0]
+
+        ecr_data = json.loads(llm_output_clean.strip())
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=500, detail=f"Failed to parse LLM response as JSON: {str(e)}")
+
+    ecr_title = ecr_data.get('proposed_change', {}).get('detailed_description', '')    
+    print(ecr_title)
+
+    document_id = str(uuid.uuid4())
+    document_filename = f"ecr_{document_id}.docx"
+
+    document_path = DOC_DIR / f"ecr_{document_id}.docx"
+    document_path = str(document_path)
+
+
+    #Mapping and creating document
+    template_path = BASE_DIR / "ECR_JSON_TEMPLATE" / "Docxtl_ECR_Template.docx"
+    template_path = str(template_path)
+    doc = DocxTemplate(template_path)
+    doc.render(ecr_data)
+
+    os.makedirs(os.path.dirname(document_path), exist_ok=True)
+    doc.save(document_path)
+
+    with Session(engine) as db_session:
+        insert_query = text("""
+            INSERT INTO ecr_database (component_id, created_at, document_id, ecr_title)
+            VALUES (:component_id, :created_at, :document_id, :ecr_title)
+        """)
+        db_session.execute(insert_query, {
+            "component_id": component_id,
+            "created_at": datetime.now(),
+            "document_id": document_filename,
+            "ecr_title": ecr_title
+        })
+        db_session.commit()
+    return document_id
+
+
+def get_or_api_key() -> str:
+    # Load OpenRouter API key
+    or_api_key = os.getenv("OPEN_ROUTER_API_KEY")
+    if not or_api_key:
+        raise HTTPException(status_code=500, detail="OPEN_ROUTER_API_KEY not found in environment variables")
+    return or_api_key
+
 
 @app.post("/api/create-ecr", response_model=ECRCreationResponse)
 async def create_ecr(request: ECRCreationRequest):
@@ -55,143 +225,20 @@ async def create_ecr(request: ECRCreationRequest):
     Create ECR from discussion summaries and generate Word document
     """
     try:
-        
-        with Session(engine) as session:
-            
-            
-            # Get discussion summaries, latest updates, and component_ids
-            discussion_data = []
-            component_ids = set()
-            
-            for discussion_id in request.discussion_ids:
-                query = text("""
-                    SELECT summary, latest_update, item_id 
-                    FROM discussion_summary 
-                    WHERE id = :discussion_id
-                """)
-                result = session.execute(query, {"discussion_id": discussion_id}).fetchone()
-                
-                if result:
-                    discussion_data.append({
-                        "discussion_summary": result[0],
-                        "latest_update": result[1],
-                        "component_id": result[2]
-                    })
-                    component_ids.add(result[2])
-            
-            if not discussion_data:
-                raise HTTPException(status_code=404, detail="No discussions found for provided IDs")
-            
-            # Combine all discussion summaries and latest updates
-            combined_discussion_summaries = "\\n\\n".join([d["discussion_summary"] for d in discussion_data])
-            combined_latest_updates = "\\n\\n".join([d["latest_update"] for d in discussion_data])
-            
-            # Assuming all discussions are for the same component (take first component_id)
-            component_id = list(component_ids)[0]
-            
-            # Fetch component details from machine_details table
-            component_query = text("""
-                SELECT product, version, name, internal_part_name, 
-                       quantity, material, category, mass, length, 
-                       tessellation_quality, finish, notes
-                FROM machine_details
-                WHERE item = :component_id
-            """)
-            component_result = session.execute(component_query, {"component_id": component_id}).fetchone()
-            
-            if not component_result:
-                raise HTTPException(status_code=404, detail=f"Component details not found for component_id: {component_id}")
-            
-            # Extract component details
-            product = component_result[0] or ""
-            version = component_result[1] or ""
-            component_name = component_result[2] or ""
-            internal_part_name = component_result[3] or ""
-            quantity = component_result[4] or ""
-            material = component_result[5] or ""
-            category = component_result[6] or ""
-            mass = component_result[7] or ""
-            length = component_result[8] or ""
-            tessellation_quality = component_result[9] or ""
-            finish = component_result[10] or ""
-            notes = component_result[11] or ""
-        
-        
-        system_prompt, user_prompt = get_ecr_editing_prompt(
-            discussion_summaries=combined_discussion_summaries,
-            latest_updates=combined_latest_updates,
-            component_id=str(component_id),
-            additional_details=request.additional_details,
-            product=product,
-            version=version,
-            component_name=component_name,
-            internal_part_name=internal_part_name,
-            quantity=quantity,
-            material=material,
-            category=category,
-            mass=mass,
-            length=length,
-            tessellation_quality=tessellation_quality,
-            finish=finish,
-            notes=notes
-        )
+        system_prompt, user_prompt, component_id = build_ecr_prompt(request)
         
         print("fetched details - starting ECR creation")
-        # Load OpenRouter API key
-        or_api_key = os.getenv("OPEN_ROUTER_API_KEY")
-        if not or_api_key:
-            raise HTTPException(status_code=500, detail="OPEN_ROUTER_API_KEY not found in environment variables")
+        or_api_key = get_or_api_key()
         
-        # Create OpenRouter client and send message
-        orclient = OpenRouterClient(or_api_key)
-        response = orclient.send_message(message=user_prompt, system_prompt=system_prompt)
+        # Shared async OpenRouter client; awaiting keeps the event loop free during the LLM call
+        orclient = get_llm_client(or_api_key)
+        response = await orclient.send_message(
+            message=user_prompt, system_prompt=system_prompt, use_cache=request.use_llm_cache
+        )
         llm_output = orclient.get_response_text(response)
         
         print("fetched response from llm - parsing and storing")
-
-        try:
-            # Clean the response in case there's markdown formatting
-            llm_output_clean = llm_output.strip()
-            if llm_output_clean.startswith("```json"):
-                llm_output_clean = llm_output_clean.split("```json")[1]
-            if llm_output_clean.endswith("```"):
-                llm_output_clean = llm_output_clean.rsplit("```", 1)[0]
-            
-            ecr_data = json.loads(llm_output_clean.strip())
-        except json.JSONDecodeError as e:
-            raise HTTPException(status_code=500, detail=f"Failed to parse LLM response as JSON: {str(e)}")
-
-        ecr_title = ecr_data.get('proposed_change', {}).get('detailed_description', '')    
-        print(ecr_title)
-        
-        document_id = str(uuid.uuid4())
-        document_filename = f"ecr_{document_id}.docx"
-
-        document_path = DOC_DIR / f"ecr_{document_id}.docx"
-        document_path = str(document_path)
-        
-        
-        #Mapping and creating document
-        template_path = BASE_DIR / "ECR_JSON_TEMPLATE" / "Docxtl_ECR_Template.docx"
-        template_path = str(template_path)
-        doc = DocxTemplate(template_path)
-        doc.render(ecr_data)
-
-        os.makedirs(os.path.dirname(document_path), exist_ok=True)
-        doc.save(document_path)
-
-        with Session(engine) as db_session:
-            insert_query = text("""
-                INSERT INTO ecr_database (component_id, created_at, document_id, ecr_title)
-                VALUES (:component_id, :created_at, :document_id, :ecr_title)
-            """)
-            db_session.execute(insert_query, {
-                "component_id": component_id,
-                "created_at": datetime.now(),
-                "document_id": document_filename,
-                "ecr_title": ecr_title
-            })
-            db_session.commit()
+        document_id = store_ecr(llm_output, component_id)
         
         print("done!")
 
@@ -210,6 +257,43 @@ async def create_ecr(request: ECRCreationRequest):
             error=str(e)
         )
 
+
+def sse_event(data: dict, event: Optional[str] = None) -> str:
+    """One server-sent event frame"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+@app.post("/api/create-ecr/stream")
+async def create_ecr_stream(request: ECRCreationRequest):
+    """
+    Same as /api/create-ecr, but relays the LLM output as server-sent events while it
+    is generated: `data: {"delta": ...}` frames, then one `event: done` frame carrying
+    the ECRCreationResponse once the document is stored (or `event: error`).
+    """
+    system_prompt, user_prompt, component_id = build_ecr_prompt(request)
+    orclient = get_llm_client(get_or_api_key())
+
+    async def relay():
+        parts = []
+        try:
+            async for delta in orclient.stream_message(
+                message=user_prompt, system_prompt=system_prompt, use_cache=request.use_llm_cache
+            ):
+                parts.append(delta)
+                yield sse_event({"delta": delta})
+
+            llm_output = "".join(parts)
+            document_id = store_ecr(llm_output, component_id)
+            result = ECRCreationResponse(success=True, document_id=document_id, llm_output=llm_output)
+            yield sse_event(result.model_dump(), event="done")
+        except HTTPException as he:
+            yield sse_event(ECRCreationResponse(success=False, error=str(he.detail)).model_dump(), event="error")
+        except Exception as e:
+            yield sse_event(ECRCreationResponse(success=False, error=str(e)).model_dump(), event="error")
+
+    return StreamingResponse(relay(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @app.get("/api/ecr/all")
 async def get_all_ecrs():
     """
@@ -0,0 +1,148 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("llm_cache")
+
+
+class LLMResponseCache:
+    """
+    Content-addressed store of chat completion responses in a local SQLite file.
+
+    The key is a hash of everything that determines the answer (model, messages,
+    temperature, max_tokens and any extra request parameters), so an identical
+    prompt is answered from disk instead of the LLM. Entries expire after `ttl`
+    seconds; past `max_entries` / `max_bytes` the least recently used are evicted.
+    Safe to share between threads and worker processes (one connection per call, WAL).
+    """
+
+    def __init__(self, path="llm_cache.sqlite", ttl=86400, max_entries=1000, max_bytes=None):
+        """
+        path: SQLite file.
+        ttl: seconds an entry stays valid (None = forever).
+        max_entries / max_bytes: size bounds enforced on every write (None = unbounded).
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.metrics = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS llm_responses_last_used ON llm_responses (last_used)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict[str, str]], temperature: float,
+                 max_tokens: Optional[int], **params) -> str:
+        """sha256 over the canonical JSON of the request fields that affect the completion"""
+        body = {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens}
+        if params:
+            body["params"] = params
+        return hashlib.sha256(json.dumps(body, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Cached response for `key`, or None if missing / expired"""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT response, created_at FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            if row and self.ttl is not None and now - row[1] > self.ttl:
+                conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                row = None
+            if row:
+                conn.execute("UPDATE llm_responses SET last_used = ? WHERE key = ?", (now, key))
+        with self._lock:
+            self.metrics["hits" if row else "misses"] += 1
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, response: Dict):
+        """Store a successful response, then evict down to the size bounds"""
+        data = json.dumps(response, ensure_ascii=False)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, response, size, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data.encode()), now, now),
+            )
+            evicted = self._evict(conn, now)
+        with self._lock:
+            self.metrics["writes"] += 1
+            self.metrics["evictions"] += evicted
+
+    def _evict(self, conn, now) -> int:
+        evicted = 0
+        if self.ttl is not None:
+            evicted += conn.execute("DELETE FROM llm_responses WHERE created_at < ?", (now - self.ttl,)).rowcount
+        if self.max_entries is not None:
+            evicted += conn.execute(
+                "DELETE FROM llm_responses WHERE key IN ("
+                "SELECT key FROM llm_responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+        if self.max_bytes is not None:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+            if total > self.max_bytes:
+                # oldest-used first until the running total fits
+                for key, size in conn.execute("SELECT key, size FROM llm_responses ORDER BY last_used").fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                    total -= size
+                    evicted += 1
+        return evicted
+
+    def delete(self, key: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM llm_responses")
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses").fetchone()
+        with self._lock:
+            out = dict(self.metrics)
+        out.update(entries=entries, bytes=size, ttl=self.ttl, max_entries=self.max_entries, max_bytes=self.max_bytes)
+        return out
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """
+    Process-wide cache configured from the environment, or None when LLM_CACHE_PATH is unset.
+    LLM_CACHE_TTL (seconds, default 86400), LLM_CACHE_MAX_ENTRIES (default 1000),
+    LLM_CACHE_MAX_BYTES (default unbounded).
+    """
+    global _cache
+    path = os.getenv("LLM_CACHE_PATH")
+    if not path:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMResponseCache(
+                path=path,
+                ttl=float(os.getenv("LLM_CACHE_TTL", "86400")),
+                max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000")),
+                max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES")) if os.getenv("LLM_CACHE_MAX_BYTES") else None,
+            )
+            logger.info("LLM response cache at %s", path)
+        return _cache
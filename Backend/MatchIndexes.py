@@ -0,0 +1,359 @@
+"""
+Search structures built once from the matcher catalogs (machine_details / supplier_master)
+"""
+
+import re
+from bisect import bisect_left
+from collections import defaultdict
+import numpy as np
+from sqlalchemy import text
+
+
+def table_fingerprint(engine, table: str):
+    """
+    Cheap change detector for a catalog table, read from Postgres's own bookkeeping
+    instead of the rows: the table's file node (changes on TRUNCATE / rewrite) and
+    its cumulative insert / update / delete counters from pg_stat_user_tables.
+    No table scan, so it costs the same for 1k and 1M rows. The counters are
+    flushed by other sessions within a few seconds of their commit; a rolled back
+    write or a stats reset only causes a harmless extra rebuild.
+    Falls back to table_checksum() when statistics are not collected (track_counts=off).
+    Returns: tuple
+    """
+    q = text(
+        "SELECT pg_relation_filenode(c.oid), s.n_tup_ins, s.n_tup_upd, s.n_tup_del "
+        "FROM pg_class c LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid "
+        "WHERE c.oid = to_regclass(:table)"
+    )
+    with engine.connect() as conn:
+        row = conn.execute(q, {"table": table}).first()
+    if row is None:
+        raise ValueError(f"Table not found: {table}")
+    if row[1] is None:
+        return table_checksum(engine, table)
+    return ("stats",) + tuple(int(v) for v in row)
+
+
+def table_checksum(engine, table: str):
+    """
+    Content checksum of a table: row count + the sum of a 64-bit hash per row,
+    computed server side in one sequential scan (no sort, constant memory, no rows
+    transferred). Exact but proportional to table size; table_fingerprint() only
+    uses it when Postgres keeps no statistics.
+    Returns: (row_count, checksum)
+    """
+    q = text(
+        f"SELECT COUNT(*), COALESCE(SUM(hashtextextended(t::text, 0)), 0)::text "
+        f"FROM {table} t"
+    )
+    with engine.connect() as conn:
+        row_count, checksum = conn.execute(q).one()
+    return (int(row_count), checksum)
+
+
+def _trigrams(term: str) -> set:
+    """Lower-cased character trigrams, padded so short words and word edges still count."""
+    padded = f"  {term.lower()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """
+    Character-trigram inverted index over a list of terms.
+    Used to shortlist candidate rows before the (expensive) WRatio scoring.
+    """
+
+    def __init__(self, terms: list[str]):
+        postings = defaultdict(list)
+        for row_id, term in enumerate(terms):
+            for gram in _trigrams(term):
+                postings[gram].append(row_id)
+
+        self.size = len(terms)
+        self.postings = {gram: np.asarray(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    def to_arrays(self):
+        """Flat form for CatalogRebuildCache: (grams, concatenated postings, offsets)."""
+        grams = sorted(self.postings)
+        lists = [self.postings[g] for g in grams]
+        offsets = np.zeros(len(grams) + 1, dtype=np.int64)
+        np.cumsum([len(ids) for ids in lists], out=offsets[1:])
+        data = np.concatenate(lists) if lists else np.empty(0, dtype=np.int32)
+        return grams, data, offsets
+
+    @classmethod
+    def from_arrays(cls, size: int, grams: list[str], data: np.ndarray, offsets: np.ndarray):
+        """Rebuild from to_arrays() output; postings are views into `data` (which may be memory-mapped)."""
+        index = cls.__new__(cls)
+        index.size = size
+        index.postings = {g: data[offsets[i]:offsets[i + 1]] for i, g in enumerate(grams)}
+        return index
+
+    def candidates(self, query: str, limit: int, min_shared: int = 1) -> np.ndarray:
+        """
+        Row ids sharing the most trigrams with `query`, at most `limit` of them.
+        Larger limit = better recall, slower scoring.
+        Returns: sorted np.ndarray of row ids
+        """
+        lists = [self.postings[g] for g in _trigrams(query) if g in self.postings]
+        if not lists:
+            return np.empty(0, dtype=np.int32)
+
+        counts = np.bincount(np.concatenate(lists), minlength=self.size)
+        ids = np.flatnonzero(counts >= min_shared)
+        if len(ids) > limit:
+            # keep the rows with the highest overlap
+            top = np.argpartition(-counts[ids], limit - 1)[:limit]
+            ids = np.sort(ids[top])
+        return ids
+
+
+_TOKEN_RE = re.compile(r"[A-Za-z0-9][\w\-./]*")
+
+
+def _tokens(text: str) -> list[tuple[str, int, int]]:
+    """(token, start, end) with trailing sentence punctuation trimmed (so "9.3.4." -> "9.3.4")."""
+    out = []
+    for m in _TOKEN_RE.finditer(text):
+        tok = m.group().rstrip(".,/-")
+        if tok:
+            out.append((tok, m.start(), m.start() + len(tok)))
+    return out
+
+
+class ExactIndex:
+    """
+    Hash lookups for explicit references in messages:
+      - dotted item IDs ("9.3.4") -> row ids, matched exactly
+      - name / internal_part_name -> row ids, matched case-insensitively on whole tokens
+    """
+
+    def __init__(self, items: list, names: list):
+        """
+        items: machine_details.item per row
+        names: for each row, the exact-matchable strings (name, internal_part_name)
+        """
+        self.ids = defaultdict(list)
+        for row_id, item in enumerate(items):
+            if item is not None and "." in str(item):
+                self.ids[str(item)].append(row_id)
+
+        self.names = defaultdict(list)
+        self.max_words = 1
+        for row_id, row_names in enumerate(names):
+            for name in dict.fromkeys(row_names):
+                words = [t for t, _, _ in _tokens(str(name))]
+                if not words:
+                    continue
+                self.names[" ".join(words).casefold()].append(row_id)
+                self.max_words = max(self.max_words, len(words))
+
+    def scan(self, text: str):
+        """
+        Greedy longest-match scan of one message.
+        Returns: (hits, residual_text)
+          hits: list of (matched_text, row_ids)
+          residual_text: text with the matched spans blanked out, for the fuzzy path
+        """
+        toks = _tokens(text)
+        hits = []
+        spans = []
+        i = 0
+        while i < len(toks):
+            for n in range(min(self.max_words, len(toks) - i), 0, -1):
+                window = toks[i:i + n]
+                key = " ".join(t for t, _, _ in window)
+                row_ids = (self.ids.get(key) if n == 1 else None) or self.names.get(key.casefold())
+                if row_ids:
+                    start, end = window[0][1], window[-1][2]
+                    hits.append((text[start:end], row_ids))
+                    spans.append((start, end))
+                    i += n
+                    break
+            else:
+                i += 1
+
+        if not spans:
+            return hits, text
+        residual = text
+        for start, end in reversed(spans):
+            residual = residual[:start] + " " + residual[end:]
+        return hits, residual
+
+
+class AhoCorasick:
+    """
+    Multi-pattern automaton: every catalog name is compiled once, then a whole
+    transcript is scanned in a single pass regardless of how many names exist.
+    Matching is case-insensitive and only whole-word occurrences are reported.
+    """
+
+    def __init__(self, min_length: int = 3):
+        self.min_length = min_length
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        self.payloads = {}  # lower-cased pattern -> {catalog: [row ids]}
+
+    def add(self, pattern: str, catalog: str, row_id: int):
+        key = " ".join(str(pattern).split()).lower()
+        if len(key) < self.min_length:
+            return
+        if key not in self.payloads:
+            self.payloads[key] = {}
+            state = 0
+            for ch in key:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                    self.goto[state][ch] = nxt
+                state = nxt
+            self.out[state].append(key)
+        self.payloads[key].setdefault(catalog, []).append(row_id)
+
+    def build(self):
+        """Compute failure links (BFS) once all patterns are added."""
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+        return self
+
+    def scan(self, text: str):
+        """
+        Leftmost-longest, non-overlapping whole-word matches.
+        Whitespace runs in the text match a single space in the pattern.
+        Returns: list of (start, end, pattern_key, {catalog: [row ids]}), offsets into `text`
+        """
+        # collapse whitespace, remembering where each kept char came from
+        chars, offsets = [], []
+        prev_space = False
+        for pos, ch in enumerate(text.lower()):
+            is_space = ch.isspace()
+            if is_space and prev_space:
+                continue
+            chars.append(" " if is_space else ch)
+            offsets.append(pos)
+            prev_space = is_space
+        lowered = "".join(chars)
+
+        found = []
+        state = 0
+        for i, ch in enumerate(lowered):
+            while state and ch not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(ch, 0)
+            for key in self.out[state]:
+                start, end = i - len(key) + 1, i + 1
+                if (start == 0 or not lowered[start - 1].isalnum()) and (end == len(lowered) or not lowered[end].isalnum()):
+                    found.append((start, end, key))
+
+        found.sort(key=lambda m: (m[0], m[0] - m[1]))
+        out = []
+        last_end = -1
+        for start, end, key in found:
+            if start >= last_end:
+                out.append((offsets[start], offsets[end - 1] + 1, key, self.payloads[key]))
+                last_end = end
+        return out
+
+
+class HierarchyIndex:
+    """
+    BOM hierarchy over dotted item IDs ("9" -> "9.3" -> "9.3.4").
+    Answers ancestor / descendant / sibling lookups from memory, with the same
+    semantics as the SQL it replaces (prefix split for parents, LIKE 'id.%' for children).
+    """
+
+    def __init__(self, items: list):
+        self.rows = defaultdict(list)  # item -> row ids (an item can repeat across products/versions)
+        for row_id, item in enumerate(items):
+            if item is not None:
+                self.rows[str(item)].append(row_id)
+        self.sorted_items = sorted(self.rows)
+
+    @staticmethod
+    def ancestors(item: str) -> list[str]:
+        """All prefix IDs, root first ("9.3.4" -> ["9", "9.3"]), whether or not they exist."""
+        parts = str(item).split(".")
+        return [".".join(parts[:k]) for k in range(1, len(parts))]
+
+    def descendants(self, item: str, direct_only: bool = False) -> list[str]:
+        """Existing items under `item`, sorted; direct_only keeps one level down."""
+        prefix = f"{item}."
+        # "/" sorts right after ".", so this slice is exactly the items starting with prefix
+        lo = bisect_left(self.sorted_items, prefix)
+        hi = bisect_left(self.sorted_items, f"{item}/")
+        out = self.sorted_items[lo:hi]
+        if direct_only:
+            out = [i for i in out if "." not in i[len(prefix):]]
+        return out
+
+    def siblings(self, item: str) -> list[str]:
+        """Existing items sharing the direct parent of `item` (excluding itself)."""
+        parents = self.ancestors(item)
+        if not parents:
+            return [i for i in self.sorted_items if "." not in i and i != str(item)]
+        return [i for i in self.descendants(parents[-1], direct_only=True) if i != str(item)]
+
+    def row_ids(self, items) -> list[int]:
+        """Row ids of every existing item in `items` (unknown IDs are skipped)."""
+        out = []
+        for item in items:
+            out.extend(self.rows.get(str(item), ()))
+        return out
+
+
+class TfidfIndex:
+    """
+    Character n-gram TF-IDF vectors of every term, built once.
+    A batch of keywords is answered with sparse matrix products (one per chunk) + top-k per row.
+    Scores are cosine similarities in [0, 1].
+    """
+
+    def __init__(self, terms: list[str], ngram_range=(2, 4)):
+        # scikit-learn is only needed for this engine
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        self.size = len(terms)
+        self.vectorizer = TfidfVectorizer(
+            analyzer="char_wb",
+            ngram_range=ngram_range,
+            lowercase=True,
+            dtype=np.float32,
+        )
+        # terms x features, transposed once so queries multiply straight into it
+        self.matrix_t = self.vectorizer.fit_transform(terms).T.tocsr()
+
+    def query(self, queries: list[str], top_k: int, min_score: float = 0.0, chunk_size: int = 128):
+        """
+        Queries are multiplied in chunks of chunk_size: short char n-grams make the
+        product nearly dense, so one chunk holds at most chunk_size x len(terms) scores.
+        Returns: list (one per query) of [(row_id, cosine), ...], best first, ties by lowest row id
+        """
+        out = []
+        for start in range(0, len(queries), chunk_size):
+            block = self.vectorizer.transform(queries[start:start + chunk_size])
+            sims = (block @ self.matrix_t).tocsr()
+            for r in range(sims.shape[0]):
+                lo, hi = sims.indptr[r], sims.indptr[r + 1]
+                ids, scores = sims.indices[lo:hi], sims.data[lo:hi]
+                keep = scores >= min_score
+                ids, scores = ids[keep], scores[keep]
+                if len(scores) > top_k:
+                    # every id scoring >= the k-th best, so ties are still resolved by id below
+                    kth = np.partition(scores, len(scores) - top_k)[len(scores) - top_k]
+                    keep = scores >= kth
+                    ids, scores = ids[keep], scores[keep]
+                order = np.lexsort((ids, -scores))[:top_k]
+                out.append([(int(ids[i]), float(scores[i])) for i in order])
+            del sims
+        return out
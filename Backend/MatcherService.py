@@ -0,0 +1,167 @@
+import os
+import time
+import threading
+import logging
+
+from ComponentMatcher import ComponentMatcher
+
+logger = logging.getLogger("matcher_service")
+
+
+class MatcherService:
+    """
+    Process-wide owner of a warm ComponentMatcher.
+
+    spaCy and the machine_details catalog are loaded once; afterwards the BOM
+    fingerprint is checked every `check_interval` seconds and the catalog is
+    rebuilt only when it actually changed. After warm_up() the checks and
+    rebuilds run on a background thread, so requests never wait for them;
+    without it, get_matcher() checks inline (outside any request lock).
+    """
+
+    def __init__(self, engine=None, source=None, check_interval=None, **matcher_kwargs):
+        """
+        engine / source: passed straight to ComponentMatcher.
+        check_interval: seconds between BOM fingerprint checks
+                        (defaults to MATCHER_CHECK_INTERVAL env var, else 30).
+        matcher_kwargs: extra ComponentMatcher options (batch_size, n_process, ...).
+        """
+        self.engine = engine
+        self.source = source
+        self.matcher_kwargs = matcher_kwargs
+        if check_interval is None:
+            check_interval = float(os.getenv("MATCHER_CHECK_INTERVAL", "30"))
+        self.check_interval = check_interval
+
+        self._matcher = None
+        self._lock = threading.Lock()
+        self._check_lock = threading.Lock()  # one fingerprint check / rebuild at a time
+        self._last_check = 0.0
+        self._stale = False
+        self._checker = None
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+
+        self.metrics = {
+            "requests": 0,
+            "warm_hits": 0,
+            "cold_loads": 0,
+            "rebuilds": 0,
+            "fingerprint_checks": 0,
+            "last_load_seconds": None,
+            "last_rebuild_at": None,
+        }
+
+    def warm_up(self):
+        """Load the matcher eagerly and start the background BOM checks (call from app startup)."""
+        self.get_matcher()
+        self.start_background_checks()
+
+    def start_background_checks(self):
+        """Check the BOM fingerprint every check_interval seconds on a daemon thread."""
+        with self._lock:
+            if self._checker is not None and self._checker.is_alive():
+                return
+            self._stopped.clear()
+            self._checker = threading.Thread(target=self._check_loop, name="matcher-bom-check", daemon=True)
+            self._checker.start()
+
+    def _check_loop(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.check_interval)
+            self._wake.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                self.check()
+            except Exception:
+                # DB hiccup: keep serving the current matcher, try again next interval
+                logger.exception("matcher BOM check failed")
+
+    def close(self):
+        """Stop the background checks and release the matcher's worker processes (call from app shutdown)."""
+        self._stopped.set()
+        self._wake.set()
+        with self._lock:
+            if self._matcher is not None:
+                self._matcher.close()
+
+    def invalidate(self):
+        """Force a rebuild at the next check (e.g. from a NOTIFY listener or admin endpoint)."""
+        with self._lock:
+            self._stale = True
+        self._wake.set()
+
+    def check(self) -> bool:
+        """
+        Fingerprint check, and rebuild if the BOM changed. The rebuilt matcher is
+        swapped in atomically; digests holding the old one keep their snapshot.
+        Returns True if a rebuild happened.
+        """
+        with self._check_lock:
+            with self._lock:
+                current, force = self._matcher, self._stale
+                self._stale = False
+            if current is None:
+                return False
+
+            self.metrics["fingerprint_checks"] += 1
+            start = time.perf_counter()
+            try:
+                matcher = current.refreshed(force=force)
+            except Exception:
+                if force:
+                    with self._lock:
+                        self._stale = True
+                raise
+            with self._lock:
+                self._last_check = time.monotonic()
+                if matcher is current:
+                    return False
+                self._matcher = matcher
+                self._record_load(start, "rebuilds")
+            logger.info("matcher catalog rebuilt in %.3fs", self.metrics["last_load_seconds"])
+            return True
+
+    def get_matcher(self) -> ComponentMatcher:
+        """
+        Returns the shared matcher, building it on first use. Without the background
+        checker the BOM is checked here, at most every check_interval seconds.
+        """
+        with self._lock:
+            self.metrics["requests"] += 1
+
+            if self._matcher is None:
+                start = time.perf_counter()
+                self._matcher = ComponentMatcher(source=self.source, engine=self.engine, **self.matcher_kwargs)
+                self._record_load(start, "cold_loads")
+                self._last_check = time.monotonic()
+                self._stale = False
+                return self._matcher
+
+            background = self._checker is not None and self._checker.is_alive()
+            due = self._stale or time.monotonic() - self._last_check >= self.check_interval
+            if background or not due:
+                self.metrics["warm_hits"] += 1
+                return self._matcher
+
+        self.check()
+        with self._lock:
+            return self._matcher
+
+    def _record_load(self, start, counter):
+        self.metrics[counter] += 1
+        self.metrics["last_load_seconds"] = round(time.perf_counter() - start, 4)
+        self.metrics["last_rebuild_at"] = time.time()
+
+    def stats(self) -> dict:
+        """Snapshot of hit / rebuild counters for monitoring."""
+        with self._lock:
+            out = dict(self.metrics)
+            out["loaded"] = self._matcher is not None
+            out["catalog_rows"] = None if self._matcher is None else len(self._matcher.df)
+            out["catalog_fingerprint"] = None if self._matcher is None else str(self._matcher.catalog_fingerprint)
+            out["check_interval"] = self.check_interval
+            out["match_cache"] = None if self._matcher is None else self._matcher.match_cache.stats()
+            out["detail_cache"] = None if self._matcher is None else self._matcher.detail_cache.stats()
+        return out
@@ -1,7 +1,22 @@
 import requests
+import httpx
 import json
 import os
-from typing import List, Dict, Optional, Union
+import asyncio
+import sqlite3
+import logging
+from requests.adapters import HTTPAdapter
+from typing import List, Dict, Optional, Union, Iterator, AsyncIterator
+
+
+class OpenRouterStreamError(Exception):
+    """Raised by the stream_* methods when the request fails or the server reports an error mid-stream"""
+
+
+# marks the "data: [DONE]" event that ends an SSE stream
+_DONE = object()
+
+logger = logging.getLogger("openrouter")
 
 
 class OpenRouterClient:
@@ -12,7 +27,10 @@ class OpenRouterClient:
         api_key: Optional[str] = None,
         model: str = "tngtech/deepseek-r1t2-chimera:free",
         site_url: Optional[str] = None,
-        site_name: Optional[str] = None
+        site_name: Optional[str] = None,
+        timeout: float = 120,
+        pool_size: int = 10,
+        cache=None
     ):
         """
         Initialize OpenRouter client
@@ -22,6 +40,10 @@ class OpenRouterClient:
             model: Model identifier
             site_url: Optional site URL for rankings
             site_name: Optional site name for rankings
+            timeout: Seconds to wait for a completion
+            pool_size: Max keep-alive connections kept open to OpenRouter
+            cache: Optional LLMResponseCache; identical requests are then answered
+                   from it (pass use_cache=False on a call to bypass)
         """
         self.api_key = api_key or os.getenv("OPENROUTER_API_KEY")
         if not self.api_key:
@@ -31,6 +53,22 @@ class OpenRouterClient:
         self.base_url = "https://openrouter.ai/api/v1/chat/completions"
         self.site_url = site_url
         self.site_name = site_name
+        self.timeout = timeout
+        self.cache = cache
+        # reused across calls so only the first request pays for TCP + TLS setup
+        self.session = self._create_session(pool_size)
+
+    def _create_session(self, pool_size: int) -> requests.Session:
+        """Pooled keep-alive session"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def close(self):
+        """Close pooled connections"""
+        self.session.close()
         
     def _get_headers(self) -> Dict[str, str]:
         """Build request headers"""
@@ -67,6 +105,12 @@ class OpenRouterClient:
         Returns:
             API response as dictionary
         """
+        messages = self._user_messages(message, system_prompt)
+        return self.chat(messages, temperature=temperature, max_tokens=max_tokens, **kwargs)
+
+    @staticmethod
+    def _user_messages(message: str, system_prompt: Optional[str] = None) -> List[Dict[str, str]]:
+        """Optional system prompt followed by the user message"""
         messages = []
         
         
@@ -75,7 +119,7 @@ class OpenRouterClient:
         
         
         messages.append({"role": "user", "content": message})
-        return self.chat(messages, temperature=temperature, max_tokens=max_tokens, **kwargs)
+        return messages
     
     def chat(
         self,
@@ -83,6 +127,7 @@ class OpenRouterClient:
         temperature: float = 0.7,
         max_tokens: Optional[int] = None,
         stream: bool = False,
+        use_cache: bool = True,
         **kwargs
     ) -> Dict:
         """
@@ -92,36 +137,208 @@ class OpenRouterClient:
             messages: List of message dicts with 'role' and 'content'
             temperature: Sampling temperature (0.0 to 2.0)
             max_tokens: Maximum tokens in response
-            stream: Whether to stream the response
+            stream: Receive the completion as server-sent events (assembled here;
+                    use stream_chat to consume the deltas as they arrive)
+            use_cache: Set False to skip the response cache for this call (the fresh
+                       answer still replaces the cached one)
             **kwargs: Additional parameters to pass to API
             
         Returns:
             API response as dictionary
         """
-        payload = {
-            "model": self.model,
-            "messages": messages,
-            "temperature": temperature,
-            **kwargs
-        }
-        
-        if max_tokens:
-            payload["max_tokens"] = max_tokens
         if stream:
-            payload["stream"] = True
+            try:
+                deltas = self.stream_chat(messages, temperature, max_tokens, use_cache=use_cache, **kwargs)
+                return self._completion("".join(deltas))
+            except OpenRouterStreamError as e:
+                return {"error": str(e), "status_code": getattr(e, "status_code", None)}
+
+        key = self._cache_key(messages, temperature, max_tokens, kwargs)
+        if key and use_cache:
+            cached = self._cache_get(key)
+            if cached:
+                return cached
+
+        payload = self._build_payload(messages, temperature, max_tokens, stream, **kwargs)
         
         try:
-            response = requests.post(
+            response = self.session.post(
                 url=self.base_url,
                 headers=self._get_headers(),
                 data=json.dumps(payload),
-                timeout=120
+                timeout=self.timeout
             )
             response.raise_for_status()
-            return response.json()
+            result = response.json()
+            if key:
+                self._cache_put(key, result)
+            return result
             
         except requests.exceptions.RequestException as e:
             return {"error": str(e), "status_code": getattr(e.response, 'status_code', None)}
+
+    def stream_chat(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        use_cache: bool = True,
+        **kwargs
+    ) -> Iterator[str]:
+        """
+        Send a conversation and yield the completion text in pieces as the
+        server-sent events arrive (first tokens in about a second instead of
+        waiting for the whole answer)
+
+        Args:
+            Same as chat; a cache hit is yielded as a single delta
+
+        Yields:
+            Content deltas (str); "".join() of them is the full response text
+
+        Raises:
+            OpenRouterStreamError: on HTTP errors, an error event or a malformed event in the stream
+        """
+        key = self._cache_key(messages, temperature, max_tokens, kwargs)
+        if key and use_cache:
+            cached = self._cache_get(key)
+            if cached:
+                yield self.get_response_text(cached)
+                return
+
+        payload = self._build_payload(messages, temperature, max_tokens, stream=True, **kwargs)
+        parts = []
+        done = False
+
+        try:
+            with self.session.post(
+                url=self.base_url,
+                headers=self._get_headers(),
+                data=json.dumps(payload),
+                timeout=self.timeout,
+                stream=True
+            ) as response:
+                response.raise_for_status()
+                # SSE has no charset in its content type; it is always UTF-8
+                response.encoding = "utf-8"
+                for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                    delta = self._parse_sse_line(line)
+                    if delta is _DONE:
+                        done = True
+                        break
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+        except requests.exceptions.RequestException as e:
+            error = OpenRouterStreamError(str(e))
+            error.status_code = getattr(e.response, 'status_code', None)
+            raise error from e
+
+        if not done:
+            # connection closed early: the text may be cut off, so it is not cached
+            logger.warning("OpenRouter stream ended without [DONE]; response not cached")
+        elif key:
+            self._cache_put(key, self._completion("".join(parts)))
+
+    def stream_message(
+        self,
+        message: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> Iterator[str]:
+        """Streaming send_message; yields content deltas (see stream_chat)"""
+        messages = self._user_messages(message, system_prompt)
+        return self.stream_chat(messages, temperature=temperature, max_tokens=max_tokens, **kwargs)
+
+    @staticmethod
+    def _parse_sse_line(line: str):
+        """
+        One line of the SSE body -> content delta, "" for keep-alives / comments /
+        role-only chunks, or _DONE at the end of the stream
+        """
+        if not line or not line.startswith("data:"):
+            # blank separators and ": OPENROUTER PROCESSING" keep-alive comments
+            return ""
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return _DONE
+        try:
+            chunk = json.loads(data)
+        except ValueError as e:
+            raise OpenRouterStreamError(f"Malformed stream event: {data[:200]}") from e
+        if "error" in chunk:
+            error = chunk["error"]
+            raise OpenRouterStreamError(error.get("message", str(error)) if isinstance(error, dict) else str(error))
+        try:
+            return chunk["choices"][0]["delta"].get("content") or ""
+        except (KeyError, IndexError):
+            return ""
+
+    def _completion(self, text: str) -> Dict:
+        """Assembled stream in the non-streaming response shape, so get_response_text works on it"""
+        return {
+            "model": self.model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}}]
+        }
+
+    def _cache_key(self, messages, temperature, max_tokens, params) -> Optional[str]:
+        """Content hash of the request, or None when no cache is configured"""
+        if self.cache is None:
+            return None
+        return self.cache.make_key(self.model, messages, temperature, max_tokens, **params)
+
+    def _cache_get(self, key: str) -> Optional[Dict]:
+        # a broken cache only costs an LLM call, it never fails one
+        try:
+            cached = self.cache.get(key)
+            if cached is not None and not isinstance(cached, dict):
+                raise ValueError(f"cached entry is a {type(cached).__name__}, not a response")
+            return cached
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache read failed: {e}")
+            return None
+        except ValueError as e:
+            # a corrupt row would fail every identical request; drop it and ask the LLM
+            logger.warning(f"LLM cache entry {key[:12]} is corrupt, dropping it: {e}")
+            try:
+                self.cache.delete(key)
+            except sqlite3.Error as e:
+                logger.warning(f"LLM cache delete failed: {e}")
+            return None
+
+    def _cache_put(self, key: str, response: Dict):
+        # only real answers are cached, never errors or empty completions
+        if "error" in response or not response.get("choices") or not self.get_response_text(response):
+            return
+        try:
+            self.cache.put(key, response)
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            # TypeError / ValueError: the response does not serialise to JSON
+            logger.warning(f"LLM cache write failed: {e}")
+
+    def _build_payload(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        stream: bool = False,
+        **kwargs
+    ) -> Dict:
+        """Request body for the chat completions endpoint"""
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            **kwargs
+        }
+        
+        if max_tokens:
+            payload["max_tokens"] = max_tokens
+        if stream:
+            payload["stream"] = True
+        return payload
     
     def get_response_text(self, response: Dict) -> Optional[str]:
         """
@@ -164,17 +381,158 @@ class OpenRouterClient:
         Returns:
             API response as dictionary
         """
-        messages = []
-        
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        
         user_message = f"{instruction}\n\nData:\n{data}"
-        messages.append({"role": "user", "content": user_message})
+        messages = self._user_messages(user_message, system_prompt)
         
         return self.chat(messages, temperature=temperature, **kwargs)
 
 
+class AsyncOpenRouterClient(OpenRouterClient):
+    """
+    Non-blocking OpenRouterClient for async FastAPI handlers, on a pooled httpx.AsyncClient.
+    Same arguments and return values; chat / send_message / analyze_data are awaited
+    and `pool_size` caps the concurrent connections to OpenRouter.
+    """
+
+    def _create_session(self, pool_size: int) -> httpx.AsyncClient:
+        """Pooled async client with connection limits"""
+        return httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+
+    async def close(self):
+        """Close pooled connections"""
+        await self.session.aclose()
+
+    async def send_message(
+        self,
+        message: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> Dict:
+        """Async send_message (see OpenRouterClient.send_message)"""
+        messages = self._user_messages(message, system_prompt)
+        return await self.chat(messages, temperature=temperature, max_tokens=max_tokens, **kwargs)
+
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        stream: bool = False,
+        use_cache: bool = True,
+        **kwargs
+    ) -> Dict:
+        """Async chat (see OpenRouterClient.chat)"""
+        if stream:
+            try:
+                deltas = self.stream_chat(messages, temperature, max_tokens, use_cache=use_cache, **kwargs)
+                return self._completion("".join([d async for d in deltas]))
+            except OpenRouterStreamError as e:
+                return {"error": str(e), "status_code": getattr(e, "status_code", None)}
+
+        # SQLite calls are quick but blocking, so they run in a worker thread
+        key = self._cache_key(messages, temperature, max_tokens, kwargs)
+        if key and use_cache:
+            cached = await asyncio.to_thread(self._cache_get, key)
+            if cached:
+                return cached
+
+        payload = self._build_payload(messages, temperature, max_tokens, stream, **kwargs)
+
+        try:
+            response = await self.session.post(
+                self.base_url,
+                headers=self._get_headers(),
+                content=json.dumps(payload),
+            )
+            response.raise_for_status()
+            result = response.json()
+            if key:
+                await asyncio.to_thread(self._cache_put, key, result)
+            return result
+
+        except httpx.HTTPError as e:
+            status_code = e.response.status_code if isinstance(e, httpx.HTTPStatusError) else None
+            return {"error": str(e), "status_code": status_code}
+
+    async def stream_chat(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        use_cache: bool = True,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """Async stream_chat: async iterator of content deltas (see OpenRouterClient.stream_chat)"""
+        key = self._cache_key(messages, temperature, max_tokens, kwargs)
+        if key and use_cache:
+            cached = await asyncio.to_thread(self._cache_get, key)
+            if cached:
+                yield self.get_response_text(cached)
+                return
+
+        payload = self._build_payload(messages, temperature, max_tokens, stream=True, **kwargs)
+        parts = []
+        done = False
+
+        try:
+            async with self.session.stream(
+                "POST",
+                self.base_url,
+                headers=self._get_headers(),
+                content=json.dumps(payload),
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    delta = self._parse_sse_line(line)
+                    if delta is _DONE:
+                        done = True
+                        break
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+        except httpx.HTTPError as e:
+            error = OpenRouterStreamError(str(e))
+            error.status_code = e.response.status_code if isinstance(e, httpx.HTTPStatusError) else None
+            raise error from e
+
+        if not done:
+            # connection closed early: the text may be cut off, so it is not cached
+            logger.warning("OpenRouter stream ended without [DONE]; response not cached")
+        elif key:
+            await asyncio.to_thread(self._cache_put, key, self._completion("".join(parts)))
+
+    def stream_message(
+        self,
+        message: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """Async stream_message: `async for delta in client.stream_message(...)`"""
+        messages = self._user_messages(message, system_prompt)
+        return self.stream_chat(messages, temperature=temperature, max_tokens=max_tokens, **kwargs)
+
+    async def analyze_data(
+        self,
+        data: str,
+        instruction: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.3,
+        **kwargs
+    ) -> Dict:
+        """Async analyze_data (see OpenRouterClient.analyze_data)"""
+        user_message = f"{instruction}\n\nData:\n{data}"
+        messages = self._user_messages(user_message, system_prompt)
+
+        return await self.chat(messages, temperature=temperature, **kwargs)
+
+
 # Convenience functions for quick usage
 def create_client(
     api_key: Optional[str] = None,
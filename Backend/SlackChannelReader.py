@@ -1,10 +1,14 @@
 import os
 import time
+import asyncio
+import aiohttp
 from dotenv import load_dotenv
-from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 from decimal import Decimal, ROUND_DOWN
 
+from SlackUserDirectory import get_user_directory
+from SlackRateLimiter import RateLimitedWebClient, RateLimitedAsyncWebClient, get_rate_limiter
+
 import logging
 logger = logging.getLogger("slack_reader")
 
@@ -12,13 +16,14 @@ logger = logging.getLogger("slack_reader")
 load_dotenv()
 
 class SlackChannelReader:
-    def __init__(self, token=None, default_channel_id=None):
+    def __init__(self, token=None, default_channel_id=None, rate_limiter=None):
         """
         Initialize the Slack Client.
         
         Args:
             token (str): Optional. Uses env variable SLACK_TOKEN if not provided.
             default_channel_id (str): Optional. Uses env variable CHANNEL_ID if not provided.
+            rate_limiter (SlackRateLimiter): Optional. Defaults to the process-wide limiter for this token.
         """
         self.slack_token = token or os.getenv("SLACK_TOKEN")
         self.default_channel_id = default_channel_id or os.getenv("CHANNEL_ID")
@@ -26,8 +31,12 @@ class SlackChannelReader:
         if not self.slack_token:
             raise ValueError("Error: SLACK_TOKEN not found in environment or arguments.")
 
-        self.client = WebClient(token=self.slack_token)
-        # Optional: Cache user names to avoid repeated API calls
+        # every call is paced per method tier and 429s are retried after Retry-After
+        self.rate_limiter = rate_limiter or get_rate_limiter(self.slack_token)
+        self.max_retries = int(os.getenv("SLACK_MAX_RETRIES", "3"))
+        self.client = RateLimitedWebClient(token=self.slack_token, limiter=self.rate_limiter, max_retries=self.max_retries)
+        # Names resolved by this reader; backed by the process-wide directory
+        self.users = get_user_directory(self.slack_token)
         self.user_cache = {}
 
     def get_user_name(self, user_id):
@@ -35,18 +44,17 @@ class SlackChannelReader:
         Helper method to resolve User IDs to Real Names.
         """
         # Return cached name if we've seen this user before
-        if user_id in self.user_cache:
-            return self.user_cache[user_id]
-
-        try:
-            response = self.client.users_info(user=user_id)
-            real_name = response["user"]["real_name"]
-            self.user_cache[user_id] = real_name
-            return real_name
-        except Exception:
-            return f"User {user_id}"
-
-    def extract_messages(self, channel_id=None, lookback_minutes=20, print_output=True):
+        if user_id not in self.user_cache:
+            self.user_cache.update(self.users.resolve([user_id], self.client))
+        return self.user_cache.get(user_id, f"User {user_id}")
+
+    def resolve_users(self, messages):
+        """Resolve every unseen author of a batch of raw Slack messages in one go."""
+        unseen = {m.get("user") for m in messages if m.get("user") not in self.user_cache}
+        if unseen:
+            self.user_cache.update(self.users.resolve(unseen, self.client))
+
+    def extract_messages(self, channel_id=None, lookback_minutes=20, print_output=True, after_ts=None, latest=None):
         """
         Fetches messages from a Slack channel.
 
@@ -54,19 +62,58 @@ class SlackChannelReader:
             channel_id (str): Override the default channel ID.
             lookback_minutes (int): How many minutes back to search (default: 20).
             print_output (bool): If True, prints logs to console (like the original script).
+            after_ts (str): Optional watermark; only messages strictly newer than it are fetched
+                            and lookback_minutes is ignored.
+            latest (str): Optional upper bound (inclusive ts) of the fetched range.
 
         Returns:
             list: A list of dictionaries containing parsed message data.
         """
+        extracted_data = []
+        for batch in self.iter_message_batches(
+            channel_id=channel_id,
+            lookback_minutes=lookback_minutes,
+            print_output=print_output,
+            after_ts=after_ts,
+            latest=latest,
+        ):
+            extracted_data.extend(batch)
+
+        if not extracted_data and print_output:
+            print("No messages found! (Did you invite the bot?)")
+        return extracted_data
+
+    def iter_message_batches(self, channel_id=None, lookback_minutes=20, print_output=False, page_size=200, after_ts=None, latest=None):
+        """
+        Generator over the whole lookback window, one parsed batch per
+        conversations_history page, following next_cursor until has_more is false.
+        Lets callers start processing before the full window has been fetched.
+
+        Args:
+            channel_id (str): Override the default channel ID.
+            lookback_minutes (int): How many minutes back to search (default: 20).
+            print_output (bool): If True, prints each message to console.
+            page_size (int): Messages per API call (Slack recommends <= 200).
+            after_ts (str): Optional watermark; fetch only messages strictly newer than it.
+            latest (str): Optional upper bound (inclusive ts), e.g. to catch up in bounded windows.
+
+        Yields:
+            list: parsed message dicts (see _parse_message), newest first.
+        """
         target_channel = channel_id or self.default_channel_id
         
         if not target_channel:
             print("Error: No Channel ID provided.")
-            return []
+            return
 
         # Calculate the timestamp
-        oldest_timestamp = Decimal(str(time.time())) - Decimal(lookback_minutes * 60)
-        oldest_str = format(oldest_timestamp.quantize(Decimal("0.000001"), rounding=ROUND_DOWN), "f")
+        if after_ts:
+            # watermark from the previous run; the message at exactly after_ts was already digested
+            oldest_timestamp = Decimal(after_ts)
+            oldest_str = after_ts
+        else:
+            oldest_timestamp = Decimal(str(time.time())) - Decimal(lookback_minutes * 60)
+            oldest_str = format(oldest_timestamp.quantize(Decimal("0.000001"), rounding=ROUND_DOWN), "f")
 
         
         if print_output:
@@ -77,75 +124,170 @@ class SlackChannelReader:
             target_channel, lookback_minutes, oldest_timestamp
         )
 
-        extracted_data = []
+        cursor = None
+        page = 0
+        while True:
+            try:
+                params = {"latest": latest} if latest else {}
+                result = self.client.conversations_history(
+                    channel=target_channel,
+                    oldest=oldest_str,
+                    inclusive=not after_ts,
+                    limit=page_size,
+                    cursor=cursor,
+                    **params,
+                )
+            except SlackApiError as e:
+                self._raise_slack_error(e, target_channel, lookback_minutes, print_output)
 
-        try:
-            result = self.client.conversations_history(
-                channel=target_channel,
-                oldest=oldest_str,
-                inclusive= True,
-                limit=100
-            )
-            print(result)
             messages = result["messages"]
+            page += 1
+            logger.info(
+                "conversations_history page=%d returned raw=%d has_more=%s",
+                page, len(messages), result.get("has_more")
+            )
 
-            logger.info("conversations_history returned raw=%d has_more=%s", len(messages), result.get("has_more"))
+            if print_output and messages:
+                print(f"--- Page {page}: {len(messages)} Messages ---\n")
 
+            batch = self.parse_messages(messages, print_output=print_output)
+            if batch:
+                yield batch
 
-            if not messages:
-                if print_output: print("No messages found! (Did you invite the bot?)")
-                return []
+            cursor = (result.get("response_metadata") or {}).get("next_cursor")
+            if not result.get("has_more") or not cursor:
+                break
 
-            if print_output: print(f"--- Found {len(messages)} Messages ---\n")
+    def parse_messages(self, messages, print_output=False):
+        """
+        Raw Slack message payloads (history pages, buffered events) -> parsed dicts,
+        system events dropped, authors resolved in one batch.
+        """
+        self.resolve_users(messages)
+        parsed = []
+        for msg in messages:
+            # 1. Filter out system events
+            if "subtype" in msg:
+                continue
 
-            for msg in messages:
-                # 1. Filter out system events
-                if "subtype" in msg:
-                    continue
+            message_obj = self._parse_message(msg)
+            parsed.append(message_obj)
 
-                # 2. Extract Data
-                user_id = msg.get("user")
-                text = msg.get("text")
-                ts = msg.get("ts")
-                
-                # 3. Resolve Name
-                name = self.get_user_name(user_id)
-                
-                # 4. Store Data
-                message_obj = {
-                    "timestamp": ts,
-                    "author": name,
-                    "text": text,
-                    "has_thread": "thread_ts" in msg
-                }
-                extracted_data.append(message_obj)
-
-                # 5. Print (Optional)
-                if print_output:
-                    print(f"[{ts}] {name}: {text}")
-                    if message_obj["has_thread"]:
-                        print(f"    (This message has a thread/replies!)")
-                    print("-" * 30)
-
-            return extracted_data
-
-        except SlackApiError as e:
-            error_code = e.response.get('error', 'unknown_error')
-
-            err = e.response.get("error", "unknown_error") if getattr(e, "response", None) else "no_response"
-            logger.exception("SlackApiError channel=%s lookback=%s error=%s", target_channel, lookback_minutes, err)
-
-            error_msg = f"Slack API error: {error_code}"
-            if error_code == 'not_in_channel':
-                error_msg += ". Bot is not in the channel. Go to the Slack channel and type '/invite @YourBotName'"
-            elif error_code == 'missing_scope':
-                error_msg += ". Missing required Slack API scope. Add 'channels:history' to your Bot Scopes."
-            elif error_code == 'channel_not_found':
-                error_msg += f". Channel ID '{target_channel}' not found. Please verify the channel ID is correct."
+            # 5. Print (Optional)
             if print_output:
-                print(f"Error fetching messages: {error_msg}")
-            # Re-raise the exception so the API can handle it
-            raise ValueError(error_msg) from e
+                print(f"[{message_obj['timestamp']}] {message_obj['author']}: {message_obj['text']}")
+                if message_obj["has_thread"]:
+                    print(f"    (This message has a thread/replies!)")
+                print("-" * 30)
+        return parsed
+
+    def _parse_message(self, msg):
+        """Slack message payload -> the dict shape used across the digest pipeline."""
+        # 2. Extract Data
+        user_id = msg.get("user")
+        text = msg.get("text")
+        ts = msg.get("ts")
+        
+        # 3. Resolve Name
+        name = self.get_user_name(user_id)
+        
+        # 4. Store Data
+        return {
+            "timestamp": ts,
+            "author": name,
+            "text": text,
+            "has_thread": "thread_ts" in msg,
+            "thread_ts": msg.get("thread_ts"),
+        }
+
+    async def expand_threads(self, messages, channel_id=None, max_concurrency=8, print_output=False):
+        """
+        Fetches the replies of every threaded message concurrently (async client,
+        at most `max_concurrency` conversations_replies calls in flight) and merges
+        them into `messages`, newest first like conversations_history.
+
+        Args:
+            messages (list): parsed messages from extract_messages / iter_message_batches.
+            channel_id (str): Override the default channel ID.
+            max_concurrency (int): Upper bound on parallel reply fetches.
+
+        Returns:
+            list: messages plus replies, sorted by timestamp (newest first).
+        """
+        target_channel = channel_id or self.default_channel_id
+        parents = [m["timestamp"] for m in messages if m.get("has_thread")]
+        if not parents:
+            return messages
+
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def fetch(thread_ts):
+            replies = []
+            cursor = None
+            async with semaphore:
+                while True:
+                    try:
+                        result = await client.conversations_replies(
+                            channel=target_channel,
+                            ts=thread_ts,
+                            limit=200,
+                            cursor=cursor,
+                        )
+                    except SlackApiError as e:
+                        self._raise_slack_error(e, target_channel, None, print_output)
+                    replies.extend(result["messages"])
+                    cursor = (result.get("response_metadata") or {}).get("next_cursor")
+                    if not result.get("has_more") or not cursor:
+                        return replies
+
+        start = time.perf_counter()
+        # one aiohttp session so the reply calls share keep-alive connections
+        async with aiohttp.ClientSession() as session:
+            client = RateLimitedAsyncWebClient(
+                token=self.slack_token, limiter=self.rate_limiter, max_retries=self.max_retries, session=session
+            )
+            threads = await asyncio.gather(*(fetch(ts) for ts in parents))
+
+        # author lookups are blocking Web API calls; keep them off the event loop
+        await asyncio.to_thread(self.resolve_users, [msg for replies in threads for msg in replies])
+
+        seen = {m["timestamp"] for m in messages}
+        merged = list(messages)
+        for raw_replies in threads:
+            for msg in raw_replies:
+                # the parent comes back as the first entry of its own thread
+                if "subtype" in msg or msg.get("ts") in seen:
+                    continue
+                seen.add(msg.get("ts"))
+                merged.append(self._parse_message(msg))
+
+        logger.info(
+            "expand_threads channel=%s threads=%d replies=%d in %.3fs",
+            target_channel, len(parents), len(merged) - len(messages), time.perf_counter() - start
+        )
+        merged.sort(key=lambda m: Decimal(m["timestamp"]), reverse=True)
+        return merged
+
+    def _raise_slack_error(self, e, target_channel, lookback_minutes, print_output):
+        """Log a SlackApiError and re-raise it as a ValueError with a readable hint."""
+        error_code = e.response.get('error', 'unknown_error')
+
+        err = e.response.get("error", "unknown_error") if getattr(e, "response", None) else "no_response"
+        logger.exception("SlackApiError channel=%s lookback=%s error=%s", target_channel, lookback_minutes, err)
+
+        error_msg = f"Slack API error: {error_code}"
+        if error_code == 'not_in_channel':
+            error_msg += ". Bot is not in the channel. Go to the Slack channel and type '/invite @YourBotName'"
+        elif error_code == 'missing_scope':
+            error_msg += ". Missing required Slack API scope. Add 'channels:history' to your Bot Scopes."
+        elif error_code == 'ratelimited':
+            error_msg += ". Still rate limited after retries; lower DIGEST_CHANNEL_CONCURRENCY or SLACK_TIER_RATES."
+        elif error_code == 'channel_not_found':
+            error_msg += f". Channel ID '{target_channel}' not found. Please verify the channel ID is correct."
+        if print_output:
+            print(f"Error fetching messages: {error_msg}")
+        # Re-raise the exception so the API can handle it
+        raise ValueError(error_msg) from e
 
 # --- EXECUTION BLOCK ---
 if __name__ == "__main__":
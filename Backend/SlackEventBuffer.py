@@ -0,0 +1,189 @@
+import os
+import re
+import json
+import time
+import hmac
+import fcntl
+import hashlib
+import threading
+import logging
+from contextlib import contextmanager
+from decimal import Decimal
+
+logger = logging.getLogger("slack_events")
+
+
+class SlackEventBuffer:
+    """
+    Durable, append-only store of Slack message events pushed to /api/slack/events.
+
+    One JSON-lines file per channel under `root`; every event is flushed and
+    fsynced before Slack is acknowledged. Digests read messages back from here
+    instead of calling conversations_history. Edits and deletes are appended too
+    and applied when reading, so the file never has to be rewritten on the hot path.
+    compact() drops everything at or below the channel's watermark once it has
+    been digested, so reads scale with undigested traffic, not channel history.
+    """
+
+    def __init__(self, root="slack_event_buffer", fsync=True):
+        self.root = root
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def path_for(self, channel_id):
+        # channel ids are [A-Z0-9]; anything else is stripped so the path stays inside root
+        return os.path.join(self.root, f"{re.sub(r'[^A-Za-z0-9_-]', '', channel_id)}.jsonl")
+
+    def append(self, event):
+        """
+        Store one `message` event (the `event` object of an event_callback).
+        Returns False for events that carry nothing to digest.
+        """
+        channel = event.get("channel")
+        if not channel or event.get("type") != "message":
+            return False
+        record = {"received_at": time.time(), "event": event}
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._locked(self.path_for(channel)) as f:
+            f.write(line)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        return True
+
+    @contextmanager
+    def _locked(self, path):
+        """
+        The channel file opened for append under an exclusive flock, so appends from
+        other worker processes never land in a copy compact() is replacing.
+        """
+        with self._lock:
+            while True:
+                f = open(path, "a+", encoding="utf-8")
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    # compact() may have swapped the file while we waited for the lock
+                    if os.path.exists(path) and os.fstat(f.fileno()).st_ino == os.stat(path).st_ino:
+                        break
+                except OSError:
+                    pass
+                f.close()
+            try:
+                yield f
+            finally:
+                f.close()
+
+    def compact(self, channel_id, up_to_ts):
+        """
+        Rewrite the channel's file without the events of messages at or below `up_to_ts`
+        (the end of a range whose digest is stored). Edits and deletes of those
+        messages go too. A no-op when there is nothing to drop.
+
+        Returns:
+            int: number of events dropped.
+        """
+        path = self.path_for(channel_id)
+        if not up_to_ts or not os.path.exists(path):
+            return 0
+
+        floor = Decimal(up_to_ts)
+        with self._locked(path) as f:
+            f.seek(0)
+            kept, dropped = [], 0
+            for line in f:
+                try:
+                    ts = _message_ts(json.loads(line)["event"])
+                except (ValueError, KeyError):
+                    dropped += 1
+                    continue
+                if ts and Decimal(ts) <= floor:
+                    dropped += 1
+                else:
+                    kept.append(line)
+            if not dropped:
+                return 0
+
+            tmp = f"{path}.compact"
+            with open(tmp, "w", encoding="utf-8") as out:
+                out.writelines(kept)
+                out.flush()
+                if self.fsync:
+                    os.fsync(out.fileno())
+            os.replace(tmp, path)
+        logger.info("compacted %s: dropped %d events, kept %d", path, dropped, len(kept))
+        return dropped
+
+    def read(self, channel_id, after_ts=None, oldest=None):
+        """
+        Buffered messages of a channel in conversations_history shape, newest first.
+
+        Args:
+            after_ts (str): only messages strictly newer than this ts (channel watermark).
+            oldest (float): otherwise, only messages at or after this epoch.
+
+        Returns:
+            list: raw Slack message dicts (same keys as conversations_history returns).
+        """
+        path = self.path_for(channel_id)
+        if not os.path.exists(path):
+            return []
+
+        floor = Decimal(after_ts) if after_ts else (Decimal(str(oldest)) if oldest is not None else None)
+        messages = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)["event"]
+                except (ValueError, KeyError):
+                    # a torn last line after a crash; everything before it is intact
+                    continue
+                subtype = event.get("subtype")
+                if subtype == "message_changed":
+                    msg = event.get("message") or {}
+                    if msg.get("ts") in messages:
+                        messages[msg["ts"]] = {**messages[msg["ts"]], **msg}
+                    continue
+                if subtype == "message_deleted":
+                    messages.pop(event.get("deleted_ts"), None)
+                    continue
+                ts = event.get("ts")
+                if not ts:
+                    continue
+                # Slack re-delivers on slow acks; the first copy wins
+                messages.setdefault(ts, {k: v for k, v in event.items() if k not in ("channel", "event_ts", "channel_type")})
+
+        out = [m for ts, m in messages.items() if floor is None or Decimal(ts) > floor or (not after_ts and Decimal(ts) == floor)]
+        out.sort(key=lambda m: Decimal(m["ts"]), reverse=True)
+        return out
+
+    def channels(self):
+        """Channel ids that have buffered events."""
+        return sorted(name[:-len(".jsonl")] for name in os.listdir(self.root) if name.endswith(".jsonl"))
+
+
+def _message_ts(event):
+    """ts of the message an event is about (the edited / deleted one for those subtypes)."""
+    subtype = event.get("subtype")
+    if subtype == "message_changed":
+        return (event.get("message") or {}).get("ts")
+    if subtype == "message_deleted":
+        return event.get("deleted_ts")
+    return event.get("ts")
+
+
+def verify_slack_signature(signing_secret, body: bytes, timestamp, signature, max_age=300):
+    """
+    Slack request signing (v0): HMAC-SHA256 of "v0:{timestamp}:{body}" with the app's signing secret.
+    Requests older than `max_age` seconds are rejected to stop replays.
+    """
+    if not timestamp or not signature:
+        return False
+    try:
+        if abs(time.time() - int(timestamp)) > max_age:
+            return False
+    except ValueError:
+        return False
+    base = b"v0:" + str(timestamp).encode() + b":" + body
+    expected = "v0=" + hmac.new(signing_secret.encode(), base, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
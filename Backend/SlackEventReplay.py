@@ -0,0 +1,110 @@
+"""
+Stands in for Slack when testing /api/slack/events offline: wraps messages in
+signed event_callback payloads and POSTs them to the digest API, the same way
+the Events API would.
+
+Events are signed with SLACK_SIGNING_SECRET (or --secret). To replay unsigned,
+start the API with SLACK_EVENTS_ALLOW_UNSIGNED=1; otherwise it rejects them.
+
+Usage (from Backend/, with the API running):
+    python SlackEventReplay.py --channel C0TEST
+    python SlackEventReplay.py --channel C0TEST --file my_messages.json --rate 5
+    python SlackEventReplay.py --channel C0TEST --url-verification
+
+--file accepts a JSON list of messages (or {"messages": [...]}) with at least
+"text"; "user", "ts" and "thread_ts" are optional. The default is the labelled
+set in benchmarks/labelled_messages.json. Then digest the buffer with
+    GET /api/digest?channel_id=C0TEST&source=buffer
+"""
+
+import os
+import sys
+import json
+import time
+import hmac
+import hashlib
+import argparse
+from pathlib import Path
+
+import requests
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_FILE = Path(__file__).resolve().parent / "benchmarks" / "labelled_messages.json"
+
+
+def sign(secret, body: bytes, timestamp: str) -> str:
+    base = b"v0:" + timestamp.encode() + b":" + body
+    return "v0=" + hmac.new(secret.encode(), base, hashlib.sha256).hexdigest()
+
+
+def post(url, payload, secret=None):
+    body = json.dumps(payload).encode()
+    headers = {"Content-Type": "application/json"}
+    if secret:
+        timestamp = str(int(time.time()))
+        headers["X-Slack-Request-Timestamp"] = timestamp
+        headers["X-Slack-Signature"] = sign(secret, body, timestamp)
+    response = requests.post(url, data=body, headers=headers, timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+
+def load_messages(path):
+    with open(path) as f:
+        data = json.load(f)
+    return data["messages"] if isinstance(data, dict) else data
+
+
+def to_events(messages, channel, user):
+    """Message dicts -> event_callback payloads with increasing ts ending now."""
+    now = time.time()
+    for i, msg in enumerate(messages):
+        ts = msg.get("ts") or f"{now - (len(messages) - i):.6f}"
+        event = {
+            "type": "message",
+            "channel": channel,
+            "user": msg.get("user", user),
+            "text": msg["text"],
+            "ts": ts,
+            "event_ts": ts,
+            "channel_type": "channel",
+        }
+        if msg.get("thread_ts"):
+            event["thread_ts"] = msg["thread_ts"]
+        yield {
+            "type": "event_callback",
+            "event_id": f"Ev{int(now)}{i:05d}",
+            "event_time": int(float(ts)),
+            "event": event,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay Slack message events into the digest API")
+    parser.add_argument("--url", default="http://localhost:8000/api/slack/events")
+    parser.add_argument("--channel", default=os.getenv("CHANNEL_ID", "C0REPLAY"))
+    parser.add_argument("--user", default="U0REPLAY", help="user id for messages without one")
+    parser.add_argument("--file", default=str(DEFAULT_FILE))
+    parser.add_argument("--rate", type=float, default=0, help="events per second (0 = as fast as possible)")
+    parser.add_argument("--secret", default=os.getenv("SLACK_SIGNING_SECRET"), help="signing secret (defaults to SLACK_SIGNING_SECRET)")
+    parser.add_argument("--url-verification", action="store_true", help="only send Slack's url_verification handshake")
+    args = parser.parse_args()
+
+    if args.url_verification:
+        print(post(args.url, {"type": "url_verification", "challenge": "replay-challenge"}, args.secret))
+        return
+
+    messages = load_messages(args.file)
+    start = time.perf_counter()
+    for payload in to_events(messages, args.channel, args.user):
+        post(args.url, payload, args.secret)
+        if args.rate:
+            time.sleep(1 / args.rate)
+    elapsed = time.perf_counter() - start
+    print(f"Replayed {len(messages)} events to {args.url} for channel {args.channel} in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
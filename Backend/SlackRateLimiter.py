@@ -0,0 +1,205 @@
+import os
+import time
+import json
+import asyncio
+import threading
+import logging
+
+from slack_sdk import WebClient
+from slack_sdk.web.async_client import AsyncWebClient
+from slack_sdk.http_retry.builtin_handlers import RateLimitErrorRetryHandler
+from slack_sdk.http_retry.builtin_async_handlers import AsyncRateLimitErrorRetryHandler
+
+logger = logging.getLogger("slack_rate")
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` calls per minute on average, bursts of up to `capacity`.
+    One instance shared by every reader keeps concurrent channel fetches under
+    the workspace's Slack quota instead of each reader pacing itself.
+    """
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or max(1, int(rate_per_minute // 6))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0
+
+    def _reserve(self):
+        """Take a token; returns how long the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+            self.waited_seconds += wait
+            return wait
+
+    def acquire(self):
+        """Block until a call is allowed."""
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Same as acquire() without blocking the event loop."""
+        wait = self._reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds):
+        """Empty the bucket so nobody calls again for `seconds` (Slack sent Retry-After)."""
+        with self._lock:
+            self.tokens = min(self.tokens, -seconds * self.rate)
+            self.updated = time.monotonic()
+
+
+# Web API tiers of the methods this app calls (https://api.slack.com/docs/rate-limits)
+SLACK_METHOD_TIERS = {
+    "conversations.history": 3,
+    "conversations.replies": 3,
+    "conversations.info": 3,
+    "users.list": 2,
+    "users.info": 4,
+    "chat.postMessage": 4,
+}
+
+# calls per minute per method for each tier
+SLACK_TIER_RATES = {1: 1, 2: 20, 3: 50, 4: 100}
+
+
+class SlackRateLimiter:
+    """
+    Client-side pacing for one Slack workspace: a TokenBucket per Web API method,
+    sized by the method's tier (Slack enforces limits per method, per workspace).
+    A 429 pauses that method's bucket for Retry-After, so every concurrent reader
+    backs off together instead of each one hammering the API and failing.
+    """
+
+    def __init__(self, tier_rates=None, method_tiers=None, default_tier=3):
+        self.tier_rates = {**SLACK_TIER_RATES, **(tier_rates or {})}
+        self.method_tiers = {**SLACK_METHOD_TIERS, **(method_tiers or {})}
+        self.default_tier = default_tier
+        self.buckets = {}
+        self._lock = threading.Lock()
+        self.metrics = {}
+
+    def bucket(self, method):
+        with self._lock:
+            bucket = self.buckets.get(method)
+            if bucket is None:
+                tier = self.method_tiers.get(method, self.default_tier)
+                bucket = self.buckets[method] = TokenBucket(self.tier_rates[tier])
+            return bucket
+
+    def _count(self, method, key, value=1):
+        with self._lock:
+            counters = self.metrics.setdefault(method, {"calls": 0, "ratelimited": 0, "retry_wait_seconds": 0.0})
+            counters[key] += value
+
+    def acquire(self, method):
+        self._count(method, "calls")
+        self.bucket(method).acquire()
+
+    async def acquire_async(self, method):
+        self._count(method, "calls")
+        await self.bucket(method).acquire_async()
+
+    def record_ratelimited(self, method, retry_after):
+        """Called on every 429: count it and hold the method's bucket for Retry-After."""
+        self._count(method, "ratelimited")
+        self._count(method, "retry_wait_seconds", retry_after)
+        self.bucket(method).pause(retry_after)
+        logger.warning("slack ratelimited method=%s retry_after=%.1fs", method, retry_after)
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = {m: dict(c) for m, c in self.metrics.items()}
+            for method, bucket in self.buckets.items():
+                out.setdefault(method, {})["throttled_seconds"] = round(bucket.waited_seconds, 3)
+        return out
+
+
+def _retry_after(response):
+    for k, v in response.headers.items():
+        if k.lower() == "retry-after":
+            return float(v[0] if isinstance(v, list) else v)
+    return 1.0
+
+
+def _method_of(request):
+    # https://slack.com/api/conversations.history -> conversations.history
+    return request.url.rstrip("/").rsplit("/", 1)[-1]
+
+
+class MeteredRateLimitRetryHandler(RateLimitErrorRetryHandler):
+    """slack_sdk's Retry-After retry, reporting each 429 to the shared limiter first."""
+
+    def __init__(self, limiter, max_retry_count=3):
+        super().__init__(max_retry_count=max_retry_count)
+        self.limiter = limiter
+
+    def prepare_for_next_attempt(self, *, state, request, response=None, error=None):
+        if response is not None:
+            self.limiter.record_ratelimited(_method_of(request), _retry_after(response))
+        super().prepare_for_next_attempt(state=state, request=request, response=response, error=error)
+
+
+class AsyncMeteredRateLimitRetryHandler(AsyncRateLimitErrorRetryHandler):
+    """Async twin of MeteredRateLimitRetryHandler."""
+
+    def __init__(self, limiter, max_retry_count=3):
+        super().__init__(max_retry_count=max_retry_count)
+        self.limiter = limiter
+
+    async def prepare_for_next_attempt_async(self, *, state, request, response=None, error=None):
+        if response is not None:
+            self.limiter.record_ratelimited(_method_of(request), _retry_after(response))
+        await super().prepare_for_next_attempt_async(state=state, request=request, response=response, error=error)
+
+
+class RateLimitedWebClient(WebClient):
+    """WebClient that waits for the limiter before every call and retries 429s after Retry-After."""
+
+    def __init__(self, token=None, limiter=None, max_retries=3, **kwargs):
+        self.limiter = limiter or SlackRateLimiter()
+        kwargs.setdefault("retry_handlers", [MeteredRateLimitRetryHandler(self.limiter, max_retries)])
+        super().__init__(token=token, **kwargs)
+
+    def api_call(self, api_method, **kwargs):
+        self.limiter.acquire(api_method)
+        return super().api_call(api_method, **kwargs)
+
+
+class RateLimitedAsyncWebClient(AsyncWebClient):
+    """AsyncWebClient counterpart of RateLimitedWebClient."""
+
+    def __init__(self, token=None, limiter=None, max_retries=3, **kwargs):
+        self.limiter = limiter or SlackRateLimiter()
+        kwargs.setdefault("retry_handlers", [AsyncMeteredRateLimitRetryHandler(self.limiter, max_retries)])
+        super().__init__(token=token, **kwargs)
+
+    async def api_call(self, api_method, **kwargs):
+        await self.limiter.acquire_async(api_method)
+        return await super().api_call(api_method, **kwargs)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(token) -> SlackRateLimiter:
+    """
+    Process-wide limiter for the workspace behind `token`.
+    SLACK_TIER_RATES (JSON, e.g. {"3": 40}) overrides the per-tier calls per minute.
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(token)
+        if limiter is None:
+            overrides = json.loads(os.getenv("SLACK_TIER_RATES") or "{}")
+            limiter = _limiters[token] = SlackRateLimiter(tier_rates={int(k): float(v) for k, v in overrides.items()})
+        return limiter
@@ -0,0 +1,216 @@
+import os
+import json
+import hashlib
+import time
+import threading
+import logging
+
+logger = logging.getLogger("slack_users")
+
+
+class SlackUserDirectory:
+    """
+    Process-wide user id -> display name cache for one Slack workspace.
+
+    The whole directory is prefetched with paginated users_list (a handful of
+    calls) instead of one users_info call per author. The sweep never runs
+    inside a digest: it is started in a background thread (at startup via
+    refresh_async(), or when a lookup finds the directory older than `ttl`),
+    and lookups keep serving the names already known, stale or not, meanwhile.
+    Ids never seen before fall back to users_info. A failed sweep is retried
+    only after `retry_interval` seconds. The directory can be persisted to a
+    JSON file so a restart does not start cold.
+    """
+
+    def __init__(self, ttl=3600, path=None, page_size=200, retry_interval=300):
+        """
+        ttl: seconds before the directory is swept again in the background.
+        path: optional JSON file the directory is loaded from / saved to.
+        page_size: users_list page size.
+        retry_interval: seconds to wait after a failed sweep before trying again.
+        """
+        self.ttl = ttl
+        self.path = path
+        self.page_size = page_size
+        self.retry_interval = retry_interval
+
+        self.names = {}  # user id -> (name, fetched_at epoch)
+        self.loaded_at = 0.0
+        self.attempted_at = 0.0
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+        self.metrics = {"hits": 0, "misses": 0, "stale_hits": 0, "list_calls": 0, "info_calls": 0, "prefetch_failures": 0}
+
+        if path:
+            self._load()
+
+    def resolve(self, user_ids, client) -> dict:
+        """
+        Names for a batch of user ids. Known names are returned as they are (a
+        background sweep refreshes them once the directory is older than ttl);
+        only ids never seen before are looked up, one users_info call each.
+
+        Args:
+            user_ids: iterable of Slack user ids (None is ignored).
+            client: slack_sdk WebClient used for any lookups.
+
+        Returns:
+            dict: user id -> name ("User <id>" when Slack cannot resolve it).
+        """
+        wanted = {u for u in user_ids if u}
+        out, missing = self._lookup(wanted)
+        if self.needs_refresh():
+            self.refresh_async(client)
+
+        for user_id in missing:
+            out[user_id] = self._users_info(user_id, client)
+        if missing and self.path:
+            self._save()
+        return out
+
+    def needs_refresh(self) -> bool:
+        """Directory older than ttl, and no failed sweep within retry_interval."""
+        now = time.time()
+        return now - self.loaded_at >= self.ttl and now - self.attempted_at >= self.retry_interval
+
+    def refresh_async(self, client):
+        """Start a users_list sweep in a background thread unless one is already running."""
+        with self._lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return
+            self.attempted_at = time.time()
+            self._refresh_thread = threading.Thread(
+                target=self.prefetch, args=(client,), name="slack-user-prefetch", daemon=True
+            )
+            self._refresh_thread.start()
+
+    def prefetch(self, client) -> bool:
+        """
+        Load every workspace member through paginated users_list.
+        Returns False if the sweep failed (nothing is replaced; retried after retry_interval).
+        """
+        start = time.perf_counter()
+        self.attempted_at = time.time()
+        fetched = {}
+        cursor = None
+        try:
+            while True:
+                result = client.users_list(limit=self.page_size, cursor=cursor)
+                self.metrics["list_calls"] += 1
+                for member in result["members"]:
+                    fetched[member["id"]] = _display_name(member)
+                cursor = (result.get("response_metadata") or {}).get("next_cursor")
+                if not cursor:
+                    break
+        except Exception as e:
+            # the names already known keep being served until a later sweep works
+            logger.exception("users_list prefetch failed after %d users", len(fetched))
+            with self._lock:
+                self.metrics["prefetch_failures"] += 1
+                self.last_error = str(e)
+                for user_id, name in fetched.items():
+                    self.names[user_id] = (name, time.time())
+            return False
+
+        now = time.time()
+        with self._lock:
+            for user_id, name in fetched.items():
+                self.names[user_id] = (name, now)
+            self.loaded_at = now
+            self.last_error = None
+        logger.info("users_list prefetched %d users in %.3fs", len(fetched), time.perf_counter() - start)
+        if self.path:
+            self._save()
+        return True
+
+    def _lookup(self, user_ids):
+        """Split ids into (cached names, stale ones included; ids never seen)."""
+        now = time.time()
+        found, missing = {}, set()
+        stale = 0
+        with self._lock:
+            for user_id in user_ids:
+                entry = self.names.get(user_id)
+                if entry:
+                    found[user_id] = entry[0]
+                    stale += now - entry[1] >= self.ttl
+                else:
+                    missing.add(user_id)
+            self.metrics["hits"] += len(found)
+            self.metrics["stale_hits"] += stale
+            self.metrics["misses"] += len(missing)
+        return found, missing
+
+    def _users_info(self, user_id, client):
+        self.metrics["info_calls"] += 1
+        try:
+            response = client.users_info(user=user_id)
+            name = _display_name(response["user"])
+        except Exception:
+            return f"User {user_id}"
+        with self._lock:
+            self.names[user_id] = (name, time.time())
+        return name
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.names = {u: (n, t) for u, (n, t) in data.get("names", {}).items()}
+        self.loaded_at = data.get("loaded_at", 0.0)
+        logger.info("loaded %d cached user names from %s", len(self.names), self.path)
+
+    def _save(self):
+        with self._lock:
+            data = {"loaded_at": self.loaded_at, "names": {u: list(v) for u, v in self.names.items()}}
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            logger.exception("could not persist user cache to %s", self.path)
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self.metrics)
+            out["users"] = len(self.names)
+            out["loaded_at"] = self.loaded_at or None
+            out["refreshing"] = self._refresh_thread is not None and self._refresh_thread.is_alive()
+            out["last_error"] = self.last_error
+        return out
+
+
+def _display_name(user):
+    profile = user.get("profile") or {}
+    return user.get("real_name") or profile.get("real_name") or user.get("name") or f"User {user.get('id')}"
+
+
+_directories = {}
+_directories_lock = threading.Lock()
+
+
+def get_user_directory(token) -> SlackUserDirectory:
+    """
+    Shared directory for the workspace behind `token`, created on first use.
+    Configured by SLACK_USER_CACHE_TTL (seconds, default 3600),
+    SLACK_USER_CACHE_RETRY (seconds after a failed sweep, default 300) and
+    SLACK_USER_CACHE_PATH (file prefix; one JSON file per workspace).
+    """
+    with _directories_lock:
+        directory = _directories.get(token)
+        if directory is None:
+            path = os.getenv("SLACK_USER_CACHE_PATH") or None
+            if path:
+                # one file per workspace, without writing the token itself to disk
+                path = f"{path}.{hashlib.sha1(token.encode()).hexdigest()[:12]}.json"
+            directory = SlackUserDirectory(
+                ttl=float(os.getenv("SLACK_USER_CACHE_TTL", "3600")),
+                retry_interval=float(os.getenv("SLACK_USER_CACHE_RETRY", "300")),
+                path=path,
+            )
+            _directories[token] = directory
+        return directory
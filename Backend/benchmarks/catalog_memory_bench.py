@@ -0,0 +1,70 @@
+"""
+Memory of the matcher's machine_details copy: full SELECT * frame vs.
+compact_catalog (CATALOG_COLUMNS only, categoricals for repeated strings).
+Each mode is loaded in a fresh interpreter from a synthetic 100k-row BOM and
+reports the frame's deep memory_usage and the process RSS growth.
+
+Usage (from Backend/):
+    python benchmarks/catalog_memory_bench.py
+    python benchmarks/catalog_memory_bench.py --rows 500000
+"""
+
+import argparse
+import json
+import random
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+BACKEND = HERE.parent
+
+sys.path.insert(0, str(HERE))
+from match_frame_bench import make_bom  # noqa: E402
+
+CHILD = """
+import gc, json, os, resource, sys
+sys.path.insert(0, {backend!r})
+from ComponentMatcher import ComponentMatcher
+
+def rss_mb():
+    # resident pages from /proc (Linux); ru_maxrss would only give the peak
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+before = rss_mb()
+matcher = ComponentMatcher(source={csv!r}, extractor="regex", compact_catalog={compact!r})
+gc.collect()
+print(json.dumps({{
+    "frame_mb": matcher.df.memory_usage(deep=True).sum() / 2**20,
+    "rss_growth_mb": rss_mb() - before,
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}}))
+"""
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100_000)
+    args = ap.parse_args()
+
+    bom = make_bom(args.rows, random.Random(5))
+    bom["notes"] = [f"Revision note for part {i}: inspected, no deviation recorded" for i in range(args.rows)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv = str(Path(tmp) / "bom.csv")
+        bom.to_csv(csv, index=False)
+
+        print(f"{args.rows} rows")
+        print(f"{'mode':>8} {'frame_mb':>9} {'rss_growth_mb':>14} {'peak_rss_mb':>12}")
+        for compact in (False, True):
+            code = CHILD.format(backend=str(BACKEND), csv=csv, compact=compact)
+            proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+            r = json.loads(proc.stdout.strip().splitlines()[-1])
+            mode = "compact" if compact else "full"
+            print(f"{mode:>8} {r['frame_mb']:>9.1f} {r['rss_growth_mb']:>14.1f} {r['peak_rss_mb']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Compares ComponentMatcher keyword extractors ("spacy" vs "regex"):
+cold start (import + construct + first digest), peak RSS, and component
+recall / hits on the labelled message set in labelled_messages.json.
+Each extractor runs in a fresh interpreter so cold start and RSS are isolated.
+
+Usage (from Backend/):
+    python benchmarks/extractor_bench.py
+    python benchmarks/extractor_bench.py --extractors regex --match-mode matrix
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+HERE = Path(__file__).resolve().parent
+BACKEND = HERE.parent
+
+# runs inside the child interpreter
+CHILD = """
+import json, resource, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {backend!r})
+from ComponentMatcher import ComponentMatcher
+matcher = ComponentMatcher(source={csv!r}, extractor={extractor!r}, exact_match=False)
+messages = json.load(open({labels!r}))["messages"]
+matcher.find_components([messages[0]["text"]], match_mode={mode!r})
+cold_start = time.perf_counter() - start
+
+found, expected, hits = 0, 0, 0
+start = time.perf_counter()
+for msg in messages:
+    comp_df, _ = matcher.find_components([msg["text"]], match_mode={mode!r})
+    names = set(comp_df["name"]) if len(comp_df) else set()
+    hits += len(names)
+    expected += len(msg["expected"])
+    found += len(names & set(msg["expected"]))
+match_s = time.perf_counter() - start
+
+print(json.dumps({{
+    "cold_start_s": cold_start,
+    "match_s": match_s,
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "recall": found / expected,
+    "distinct_hits": hits,
+}}))
+"""
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--extractors", nargs="+", default=["spacy", "regex"])
+    ap.add_argument("--match-mode", default="loop")
+    args = ap.parse_args()
+
+    labels = HERE / "labelled_messages.json"
+    catalog = pd.DataFrame(json.loads(labels.read_text())["catalog"])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv = str(Path(tmp) / "catalog.csv")
+        catalog.to_csv(csv, index=False)
+
+        print(f"{'extractor':>9} {'cold_start_s':>13} {'peak_rss_mb':>12} {'match_s':>8} {'recall':>7} {'hits':>5}")
+        for extractor in args.extractors:
+            code = CHILD.format(backend=str(BACKEND), csv=csv, labels=str(labels), extractor=extractor, mode=args.match_mode)
+            proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+            if proc.returncode != 0:
+                print(f"{extractor:>9} failed: {proc.stderr.strip().splitlines()[-1]}")
+                continue
+            r = json.loads(proc.stdout.strip().splitlines()[-1])
+            print(
+                f"{extractor:>9} {r['cold_start_s']:>13.2f} {r['peak_rss_mb']:>12.1f} "
+                f"{r['match_s']:>8.3f} {r['recall']:>7.2f} {r['distinct_hits']:>5}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Micro-benchmark for ComponentMatcher._matches_to_df:
+per-hit base_df.iloc[idx].to_dict() + pd.DataFrame(hits) (old) vs. one
+base_df.take(indices) + column assignment (current).
+Reports wall time and tracemalloc peak for each.
+
+Usage (from Backend/):
+    python benchmarks/match_frame_bench.py
+    python benchmarks/match_frame_bench.py --rows 50000 --keywords 500 --top-k 5
+"""
+
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from ComponentMatcher import ComponentMatcher  # noqa: E402
+
+
+def make_bom(n: int, rng: random.Random) -> pd.DataFrame:
+    """machine_details-shaped frame"""
+    return pd.DataFrame({
+        "product": ["Warehouse Robot"] * n,
+        "version": [f"V{rng.randint(1, 3)}" for _ in range(n)],
+        "item": [f"{i // 100}.{i // 10 % 10}.{i % 10}" for i in range(n)],
+        "name": [f"Part {i}" for i in range(n)],
+        "internal_part_name": [f"PN-{i:06d}" for i in range(n)],
+        "quantity": np.ones(n, dtype=np.int64),
+        "material": [rng.choice(["Steel", "Wood", "Aluminium"]) for _ in range(n)],
+        "category": [rng.choice(["Fastener", "Assembly", "Motion"]) for _ in range(n)],
+        "mass": np.random.default_rng(0).random(n),
+        "length": np.random.default_rng(1).random(n),
+        "tessellation_quality": ["Medium"] * n,
+        "finish": ["None"] * n,
+        "notes": ["" for _ in range(n)],
+        "child_identifier": [f"{i:032x}" for i in range(n)],
+    })
+
+
+def old_matches_to_df(keyword_matches, base_df, matched_text_col):
+    hits = []
+    for kw, matches in keyword_matches:
+        for rank, (best_match_text, score, idx) in enumerate(matches, start=1):
+            row = base_df.iloc[idx].to_dict()
+            row.update({
+                "matched_keyword": kw,
+                "match_score": score,
+                "match_rank": rank,
+                matched_text_col: best_match_text,
+                "choice_index": idx,
+            })
+            hits.append(row)
+    return pd.DataFrame(hits)
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    out = fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return out, elapsed, peak
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=50_000)
+    ap.add_argument("--keywords", type=int, default=500)
+    ap.add_argument("--top-k", type=int, default=5)
+    args = ap.parse_args()
+
+    rng = random.Random(3)
+    bom = make_bom(args.rows, rng)
+    keyword_matches = [
+        (f"kw{k}", [(f"Part {i}", 90.0 - r, i) for r, i in enumerate(rng.sample(range(args.rows), args.top_k))])
+        for k in range(args.keywords)
+    ]
+
+    # _matches_to_df does not touch instance state, so skip spaCy / catalog loading
+    matcher = ComponentMatcher.__new__(ComponentMatcher)
+
+    old, old_s, old_peak = measure(old_matches_to_df, keyword_matches, bom, "matched_component_text")
+    new, new_s, new_peak = measure(matcher._matches_to_df, keyword_matches, bom, "matched_component_text")
+
+    assert list(old.columns) == list(new.columns)
+    assert old["choice_index"].tolist() == new["choice_index"].tolist()
+
+    print(f"hits: {len(new)}  ({args.keywords} keywords x top {args.top_k}, {args.rows} catalog rows)")
+    print(f"{'':>10} {'seconds':>9} {'peak_MB':>9}")
+    print(f"{'iloc/dict':>10} {old_s:>9.4f} {old_peak / 2**20:>9.2f}")
+    print(f"{'take':>10} {new_s:>9.4f} {new_peak / 2**20:>9.2f}")
+    print(f"speedup x{old_s / new_s:.1f}, peak memory x{old_peak / new_peak:.1f} lower")
+
+
+if __name__ == "__main__":
+    main()
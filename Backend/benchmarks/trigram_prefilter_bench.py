@@ -0,0 +1,88 @@
+"""
+Latency of full-catalog WRatio scoring vs. trigram-shortlisted scoring
+(ComponentMatcher prefilter) for synthetic catalogs from 1k to 1M rows.
+
+Usage (from Backend/):
+    python benchmarks/trigram_prefilter_bench.py
+    python benchmarks/trigram_prefilter_bench.py --sizes 1000 100000 --prefilter 500 2000
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+from rapidfuzz import process, fuzz
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from MatchIndexes import TrigramIndex  # noqa: E402
+
+PART_WORDS = [
+    "Screw", "Bolt", "Nut", "Washer", "Gantry", "Belt", "Pulley", "Rotator", "Bracket",
+    "Frame", "Motor", "Stepper", "Bearing", "Shaft", "Coupling", "Spacer", "Rail", "Carriage",
+    "Gear", "Sensor", "Cable", "Clamp", "Plate", "Housing", "Spring", "Pin", "Hinge",
+]
+MODIFIERS = ["Wooden", "Metal", "Steel", "Aluminium", "Timing", "Linear", "Upper", "Lower", "Left", "Right"]
+
+
+def make_catalog(n: int, rng: random.Random) -> list[str]:
+    """name + internal_part_name, like ComponentMatcher.component_terms"""
+    return [
+        f"{rng.choice(MODIFIERS)} {rng.choice(PART_WORDS)} M{rng.randint(2, 40)} PN-{i:07d}"
+        for i in range(n)
+    ]
+
+
+def make_keywords(k: int, rng: random.Random) -> list[str]:
+    """Slack-style single tokens, some with a typo"""
+    out = []
+    for _ in range(k):
+        word = rng.choice(PART_WORDS + MODIFIERS).lower()
+        if rng.random() < 0.3 and len(word) > 4:
+            i = rng.randrange(len(word))
+            word = word[:i] + word[i + 1:]
+        out.append(word)
+    return out
+
+
+def top1(query, choices, ids=None):
+    pool = choices if ids is None else [choices[i] for i in ids]
+    hit = process.extractOne(query, pool, scorer=fuzz.WRatio, score_cutoff=50)
+    return hit[1] if hit else 0.0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    ap.add_argument("--prefilter", type=int, nargs="+", default=[200, 1000, 5000])
+    ap.add_argument("--keywords", type=int, default=20)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    keywords = make_keywords(args.keywords, rng)
+
+    print(f"{'rows':>9} {'mode':>14} {'build_s':>8} {'ms/keyword':>11} {'top1_recall':>12}")
+    for n in args.sizes:
+        choices = make_catalog(n, rng)
+
+        start = time.perf_counter()
+        full_scores = [top1(q, choices) for q in keywords]
+        full_ms = (time.perf_counter() - start) * 1000 / len(keywords)
+        print(f"{n:>9} {'full scan':>14} {'-':>8} {full_ms:>11.2f} {1.0:>12.2f}")
+
+        start = time.perf_counter()
+        index = TrigramIndex(choices)
+        build_s = time.perf_counter() - start
+
+        for limit in args.prefilter:
+            start = time.perf_counter()
+            scores = [top1(q, choices, index.candidates(q, limit)) for q in keywords]
+            ms = (time.perf_counter() - start) * 1000 / len(keywords)
+            recall = sum(s >= f for s, f in zip(scores, full_scores)) / len(keywords)
+            print(f"{n:>9} {f'prefilter={limit}':>14} {build_s:>8.2f} {ms:>11.2f} {recall:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()